@@ -1,7 +1,114 @@
 from __future__ import annotations
 import argparse
+import csv
+import json
 import sys
-from .core import generate_from_text
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Deque, Dict, Iterator, Optional, TextIO, Tuple
+from . import metrics
+from .core import generate_from_text, generate_many, stream_from_text
+from .generators.cpu import CPU_MODES
+
+
+def _detect_format(path: str, first_line: str) -> str:
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if path.endswith(".csv"):
+        return "csv"
+    return "jsonl" if first_line.lstrip().startswith(("{", '"')) else "lines"
+
+
+def _read_inputs(f: TextIO, fmt: str, field: str) -> Iterator[Tuple[Optional[Any], Optional[str], Optional[str]]]:
+    """Yield (id, text, error) per input record; unreadable records carry an error instead of text."""
+    if fmt == "csv":
+        for row in csv.DictReader(f):
+            text = row.get(field)
+            if text is None:
+                yield row.get("id"), None, f"missing column {field!r}"
+            else:
+                yield row.get("id"), text, None
+        return
+    for line in f:
+        if not line.strip():
+            continue
+        if fmt == "lines":
+            yield None, line.rstrip("\r\n"), None
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            yield None, None, f"invalid JSON: {e}"
+            continue
+        if isinstance(rec, str):
+            yield None, rec, None
+        elif isinstance(rec, dict) and isinstance(rec.get(field), str):
+            yield rec.get("id"), rec[field], None
+        else:
+            yield rec.get("id") if isinstance(rec, dict) else None, None, f"missing string field {field!r}"
+
+
+def _run_batch(args: argparse.Namespace) -> int:
+    src: TextIO = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8", newline="")
+    dst: TextIO = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        first = src.readline()
+        fmt = args.input_format if args.input_format != "auto" else _detect_format(args.input, first)
+        records = _read_inputs(_chain(first, src), fmt, args.field)
+
+        # Records waiting for their result, in input order; unreadable ones never reach the workers.
+        pending: Deque[Tuple[int, Optional[Any], Optional[str]]] = deque()
+        counter = iter(range(sys.maxsize))
+
+        def _texts() -> Iterator[str]:
+            for rec_id, text, err in records:
+                pending.append((next(counter), rec_id, err))
+                if err is None:
+                    yield text  # type: ignore[misc]
+
+        counts = {"ok": 0, "failed": 0}
+
+        def _emit(out: Dict[str, Any]) -> None:
+            counts["ok" if out["ok"] else "failed"] += 1
+            dst.write(json.dumps(out, ensure_ascii=False) + "\n")
+
+        def _flush_errors() -> None:
+            while pending and pending[0][2] is not None:
+                i, rec_id, err = pending.popleft()
+                _emit(_record(i, rec_id, {"ok": False, "error": err}))
+
+        for item in generate_many(
+            _texts(), llm_base_model=args.llm_base_model, workers=args.workers, llm_mode=args.llm_mode, seed=args.seed
+        ):
+            _flush_errors()
+            i, rec_id, _ = pending.popleft()
+            if item.result is None:
+                _emit(_record(i, rec_id, {"ok": False, "error": item.error}))
+            else:
+                res = item.result
+                _emit(_record(i, rec_id, {"ok": True, "lang": res.lang.code, "profile": asdict(res.profile), "plan": res.text}))
+        _flush_errors()
+        dst.flush()
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    print(f"{counts['ok']} ok, {counts['failed']} failed", file=sys.stderr)
+    return 1 if counts["failed"] else 0
+
+
+def _chain(first: str, rest: TextIO) -> Iterator[str]:
+    yield first
+    yield from rest
+
+
+def _record(index: int, rec_id: Optional[Any], body: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"index": index}
+    if rec_id is not None:
+        out["id"] = rec_id
+    out.update(body)
+    return out
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -13,17 +120,91 @@ def main(argv: list[str] | None = None) -> int:
         pass
 
     p = argparse.ArgumentParser(description="Generate a bilingual nutrition + workout plan from free text.")
-    p.add_argument("text", help="User message containing height, weight, and sport.")
+    p.add_argument("text", nargs="?", help="User message containing height, weight, and sport.")
     p.add_argument(
         "--llm",
         dest="llm_base_model",
         default=None,
         help="Optional HuggingFace model name/path for stronger generation (requires transformers/torch).",
     )
+    p.add_argument(
+        "--llm-mode",
+        choices=[f"{m}{c}" for m in CPU_MODES for c in ("", "+compile")],
+        default=None,
+        help="CPU inference for --llm: fp32, bf16 or int8 (dynamic quantization), optionally +compile "
+        "(default FEEDING_AI_LLM_MODE; unset = float16 with automatic device placement).",
+    )
+    p.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Sampling seed for --llm: the same seed reproduces the same plan.",
+    )
+    p.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="torch intra-op threads for --llm (default FEEDING_AI_TORCH_THREADS, else torch's choice).",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the plan incrementally as it is generated.",
+    )
+    p.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-stage timing breakdown to stderr.",
+    )
+    p.add_argument(
+        "--input",
+        default=None,
+        help="Batch mode: read messages from this file ('-' for stdin) and write one JSON result per line.",
+    )
+    p.add_argument(
+        "--input-format",
+        choices=["auto", "jsonl", "csv", "lines"],
+        default="auto",
+        help="Input format for --input (auto: by extension, else JSONL if lines look like JSON, else plain lines).",
+    )
+    p.add_argument(
+        "--field",
+        default="text",
+        help="JSONL key / CSV column holding the message (an `id` field, if present, is echoed).",
+    )
+    p.add_argument("--output", default="-", help="Batch mode output file ('-' for stdout).")
+    p.add_argument("--workers", type=int, default=1, help="Batch mode worker processes (threads with --llm).")
+    # Batch mode exits 1 if any record failed; failures are still written as {"ok": false, "error": ...} lines.
     args = p.parse_args(argv)
+    if args.threads and args.llm_base_model:
+        from .generators.cpu import set_threads
+
+        set_threads(args.threads)
+
+    if args.input is not None:
+        if args.text is not None or args.stream:
+            p.error("--input cannot be combined with a text argument or --stream")
+        return _run_batch(args)
+    if args.text is None:
+        p.error("text is required unless --input is given")
 
+    if args.profile:
+        metrics.enable()
     try:
-        res = generate_from_text(args.text, llm_base_model=args.llm_base_model)
+        with metrics.collect() as stages:
+            if args.stream:
+                res = stream_from_text(
+                    args.text, llm_base_model=args.llm_base_model, llm_mode=args.llm_mode, seed=args.seed
+                )
+                for chunk in res.chunks:
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+                sys.stdout.write("\n")
+            else:
+                res = generate_from_text(
+                    args.text, llm_base_model=args.llm_base_model, llm_mode=args.llm_mode, seed=args.seed
+                )
+                print(res.text)
     except Exception as e:
         msg = str(e)
         # best-effort Arabic detection for error printing
@@ -33,7 +214,8 @@ def main(argv: list[str] | None = None) -> int:
             print(f"Error: {msg}", file=sys.stderr)
         return 2
 
-    print(res.text)
+    if args.profile:
+        print(metrics.format_breakdown(stages), file=sys.stderr)
     return 0
 
 
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Sequence, Tuple
+
+import numpy as np
+
+from .nutrition import FAT_PER_KG, KCAL_PER_KG, PROTEIN_PER_KG, sport_type
+from .parser import Profile
+
+SPORT_TYPES: Tuple[str, ...] = ("low", "mixed", "endurance", "strength")
+
+_KCAL = np.array([KCAL_PER_KG[t] for t in SPORT_TYPES])
+_PROTEIN = np.array([PROTEIN_PER_KG[t] for t in SPORT_TYPES])
+_FAT = np.array([FAT_PER_KG[t] for t in SPORT_TYPES])
+
+
+@dataclass(frozen=True)
+class ProfileBatch:
+    """
+    Columnar view of many profiles.
+    `sport` holds integer codes into `sport_keys`; `sport_type` holds codes into SPORT_TYPES.
+    """
+
+    height_cm: np.ndarray
+    weight_kg: np.ndarray
+    sport: np.ndarray
+    sport_type: np.ndarray
+    sport_keys: Tuple[str, ...]
+
+    def __len__(self) -> int:
+        return int(self.weight_kg.shape[0])
+
+    @classmethod
+    def from_columns(cls, height_cm: Sequence[float], weight_kg: Sequence[float], sports: Sequence[str]) -> "ProfileBatch":
+        height = np.asarray(height_cm, dtype=np.float64)
+        weight = np.asarray(weight_kg, dtype=np.float64)
+        keys, codes = np.unique(np.asarray(sports, dtype=object).astype(str), return_inverse=True)
+        if not (height.shape == weight.shape == codes.shape):
+            raise ValueError("height_cm, weight_kg and sports must have the same length")
+        type_of_key = np.array([SPORT_TYPES.index(sport_type(k)) for k in keys], dtype=np.int8)
+        return cls(
+            height_cm=height,
+            weight_kg=weight,
+            sport=codes.astype(np.int32),
+            sport_type=type_of_key[codes] if len(keys) else np.zeros(0, dtype=np.int8),
+            sport_keys=tuple(str(k) for k in keys),
+        )
+
+    @classmethod
+    def from_profiles(cls, profiles: Iterable[Profile]) -> "ProfileBatch":
+        rows = list(profiles)
+        return cls.from_columns(
+            [p.height_cm for p in rows],
+            [p.weight_kg for p in rows],
+            [p.sport for p in rows],
+        )
+
+
+@dataclass(frozen=True)
+class DailyTargetsBatch:
+    calories_kcal: np.ndarray
+    protein_g: np.ndarray
+    carbs_g: np.ndarray
+    fats_g: np.ndarray
+    water_liters: np.ndarray
+
+
+def _round1(x: np.ndarray) -> np.ndarray:
+    """round(x, 1) as Python does it (correctly rounded), not numpy's scale-and-rint."""
+    out = np.round(x, 1)
+    # Only values whose tenth digit sits on a half can differ; fix those up exactly.
+    frac = x * 10.0 - np.floor(x * 10.0)
+    near_half = np.abs(frac - 0.5) < 1e-6
+    if near_half.any():
+        out[near_half] = [round(float(v), 1) for v in x[near_half]]
+    return out
+
+
+def estimate_daily_targets_batch(batch: ProfileBatch) -> DailyTargetsBatch:
+    """Vectorized `estimate_daily_targets`; same clamping and (half-to-even) rounding per row."""
+    wt = batch.weight_kg.astype(np.float64, copy=False)
+    st = batch.sport_type.astype(np.intp, copy=False)
+
+    calories = np.clip(np.rint(wt * _KCAL[st]), 1600, 4200).astype(np.int64)
+    protein_g = np.rint(wt * _PROTEIN[st]).astype(np.int64)
+    fats_g = np.clip(np.rint(wt * _FAT[st]), 45, 120).astype(np.int64)
+
+    remaining = np.maximum(0, calories - protein_g * 4 - fats_g * 9)
+    carbs_g = np.rint(remaining / 4).astype(np.int64)
+
+    water_liters = _round1(np.clip(wt * 0.035, 2.0, 5.0))
+
+    return DailyTargetsBatch(
+        calories_kcal=calories,
+        protein_g=protein_g,
+        carbs_g=carbs_g,
+        fats_g=fats_g,
+        water_liters=water_liters,
+    )
@@ -1,9 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from . import metrics
 from .generators.rule_based import RuleBasedGenerator
 from .lang import Lang, detect_lang
 from .parser import Profile, parse_profile
+from .plan import Plan
 
 
 @dataclass(frozen=True)
@@ -13,22 +17,175 @@ class GenerateResult:
     text: str
 
 
+@dataclass(frozen=True)
+class PlanResult:
+    lang: Lang
+    profile: Profile
+    plan: Plan
+
+
+@dataclass(frozen=True)
+class ManyResult:
+    """One input of `generate_many`: `result` on success, otherwise `error`."""
+
+    index: int
+    result: Optional[GenerateResult] = None
+    error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class StreamResult:
+    lang: Lang
+    profile: Profile
+    chunks: Iterator[str]
+
+
 def generate_from_text(
     text: str,
     *,
     llm_base_model: Optional[str] = None,
+    batched: bool = False,
+    llm_mode: Optional[str] = None,
+    seed: Optional[int] = None,
 ) -> GenerateResult:
-    lang = detect_lang(text)
-    profile = parse_profile(text, lang)
+    """
+    Detect, parse and generate one plan. `llm_base_model` may name a LoRA adapter as
+    `MODEL@ADAPTER`; `llm_mode` selects CPU inference for the LLM (`fp32`, `bf16`, `int8`,
+    optionally `+compile`; default FEEDING_AI_LLM_MODE); `seed` makes LLM sampling reproducible.
+    """
+    with metrics.stage("detect_lang"):
+        lang = detect_lang(text)
+    with metrics.stage("parse"):
+        profile = parse_profile(text, lang)
 
     if llm_base_model:
         from .generators.llm import LLMGenerator
+        from .generators.output_cache import canonical_key, get_output_cache
 
-        gen = LLMGenerator(base_model=llm_base_model)
-        out = gen.generate(profile, lang)
+        gen = LLMGenerator.from_spec(llm_base_model, llm_mode, seed=seed)
+        # Checked before the model pool is touched: a hit never loads a model.
+        cache = get_output_cache()
+        if cache is not None:
+            key = canonical_key(profile, lang, gen)
+            with metrics.stage("cache_lookup"):
+                cached = cache.get(key)
+            if cached is not None:
+                return GenerateResult(lang=lang, profile=profile, text=cached)
+
+        if batched:
+            done = gen.submit(profile, lang).result()
+            if metrics.enabled():
+                decode_s = (done.total_ms - done.queue_ms - done.tokenize_ms) / 1e3
+                metrics.record_stage("queue", done.queue_ms / 1e3)
+                metrics.record_stage("tokenize", done.tokenize_ms / 1e3)
+                metrics.record_stage("decode", decode_s)
+                metrics.observe_llm(done.new_tokens, decode_s, done.ttft_ms / 1e3)
+            out = done.text
+        else:
+            out = gen.generate(profile, lang)
+        if cache is not None:
+            cache.put(key, out)
     else:
         gen = RuleBasedGenerator()
         out = gen.generate(profile, lang)
 
     return GenerateResult(lang=lang, profile=profile, text=out)
 
+
+def _generate_chunk(
+    texts: List[str], llm_base_model: Optional[str], llm_mode: Optional[str] = None, seed: Optional[int] = None
+) -> List[Tuple[Optional[GenerateResult], Optional[str]]]:
+    out: List[Tuple[Optional[GenerateResult], Optional[str]]] = []
+    for text in texts:
+        try:
+            res = generate_from_text(
+                text, llm_base_model=llm_base_model, batched=bool(llm_base_model), llm_mode=llm_mode, seed=seed
+            )
+            out.append((res, None))
+        except Exception as e:
+            out.append((None, str(e)))
+    return out
+
+
+def generate_many(
+    texts: Iterable[str],
+    *,
+    llm_base_model: Optional[str] = None,
+    workers: int = 1,
+    chunk_size: int = 64,
+    llm_mode: Optional[str] = None,
+    seed: Optional[int] = None,
+) -> Iterator[ManyResult]:
+    """
+    Generate plans for many texts, yielding results lazily in input order; a failing text
+    yields an error result instead of raising. With workers > 1 rule-based chunks run in a
+    process pool; LLM requests use threads so they share the in-process batching scheduler.
+    At most a few chunks per worker are in flight, so arbitrarily long inputs stream.
+    """
+    it = iter(texts)
+    workers = max(1, int(workers))
+    if llm_base_model:
+        chunk_size = 1
+    chunk_size = max(1, int(chunk_size))
+    index = 0
+
+    if workers == 1:
+        while True:
+            chunk = list(islice(it, chunk_size))
+            if not chunk:
+                return
+            for res, err in _generate_chunk(chunk, llm_base_model, llm_mode, seed):
+                yield ManyResult(index=index, result=res, error=err)
+                index += 1
+
+    from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+    pool = ThreadPoolExecutor(max_workers=workers) if llm_base_model else ProcessPoolExecutor(max_workers=workers)
+    pending: Deque[Future] = deque()
+    try:
+        while True:
+            while len(pending) < workers * 4:
+                chunk = list(islice(it, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_generate_chunk, chunk, llm_base_model, llm_mode, seed))
+            if not pending:
+                return
+            for res, err in pending.popleft().result():
+                yield ManyResult(index=index, result=res, error=err)
+                index += 1
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def plan_from_text(text: str) -> PlanResult:
+    """Rule-based plan as a structured `Plan` (markdown, JSON and HTML renderers)."""
+    lang = detect_lang(text)
+    profile = parse_profile(text, lang)
+    return PlanResult(lang=lang, profile=profile, plan=RuleBasedGenerator().build_plan(profile, lang))
+
+
+def stream_from_text(
+    text: str,
+    *,
+    llm_base_model: Optional[str] = None,
+    llm_mode: Optional[str] = None,
+    seed: Optional[int] = None,
+) -> StreamResult:
+    """
+    Like `generate_from_text`, but the plan is produced lazily as text chunks.
+    Detection and parsing run eagerly so invalid input fails before anything is streamed.
+    """
+    with metrics.stage("detect_lang"):
+        lang = detect_lang(text)
+    with metrics.stage("parse"):
+        profile = parse_profile(text, lang)
+
+    if llm_base_model:
+        from .generators.llm import LLMGenerator
+
+        chunks = LLMGenerator.from_spec(llm_base_model, llm_mode, seed=seed).stream(profile, lang)
+    else:
+        chunks = RuleBasedGenerator().stream(profile, lang)
+
+    return StreamResult(lang=lang, profile=profile, chunks=chunks)
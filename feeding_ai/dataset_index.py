@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import random
+import shutil
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+PathLike = Union[str, Path]
+
+INDEX_VERSION = 1
+# Record fields with postings lists; `sport` is read from the nested profile.
+POSTING_FIELDS = ("lang", "sport")
+# Rows are bucketed by the top bits of their id hash while indexing, so sorting by id
+# only ever holds one bucket's rows as Python objects.
+_ID_BUCKET_BITS = 8
+
+
+def index_dir(path: PathLike) -> Path:
+    return Path(str(path) + ".idx")
+
+
+def _id_hash(record_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(record_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _source_stamp(path: PathLike) -> Dict[str, int]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _field(rec: Dict[str, Any], name: str) -> Optional[str]:
+    value = rec.get(name)
+    if value is None and name == "sport":
+        value = (rec.get("profile") or {}).get("sport")
+    return None if value is None else str(value)
+
+
+def build_index(path: PathLike) -> Path:
+    """
+    One streaming pass over a JSONL dataset, writing a sidecar `<path>.idx/` directory:
+
+    - `offsets.u64`: byte offset of every record, plus the file size (record i is offsets[i]:offsets[i + 1]);
+    - `ids.u64` / `id_rows.u32`: 64-bit id hashes sorted, with their row numbers (binary search by id);
+    - `postings.u32` + `meta.json`: row numbers per lang and per sport, as ranges into one array.
+
+    All arrays are raw native-endian and memory-mapped by `IndexedJsonl`.
+    """
+    if str(path).endswith(".parquet"):
+        raise ValueError("Parquet datasets already support random access; the offset index is for JSONL")
+    offsets = array("Q")
+    hashes = array("Q")
+    buckets = [array("I") for _ in range(1 << _ID_BUCKET_BITS)]
+    postings: Dict[str, Dict[str, array]] = {f: {} for f in POSTING_FIELDS}
+    pos = 0
+    row = 0
+    with open(path, "rb") as f:
+        for line in f:
+            start = pos
+            pos += len(line)
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            offsets.append(start)
+            h = _id_hash(str(rec.get("id", row)))
+            hashes.append(h)
+            buckets[h >> (64 - _ID_BUCKET_BITS)].append(row)
+            for name in POSTING_FIELDS:
+                value = _field(rec, name)
+                if value is not None:
+                    rows = postings[name].get(value)
+                    if rows is None:
+                        rows = postings[name][value] = array("I")
+                    rows.append(row)
+            row += 1
+    offsets.append(pos)
+
+    flat = array("I")
+    table: Dict[str, Dict[str, List[int]]] = {}
+    for name, values in postings.items():
+        table[name] = {}
+        for value, rows in sorted(values.items()):
+            table[name][value] = [len(flat), len(rows)]
+            flat.extend(rows)
+
+    out = index_dir(path)
+    tmp = out.with_name(out.name + f".tmp{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    with open(tmp / "offsets.u64", "wb") as f:
+        offsets.tofile(f)
+    with open(tmp / "ids.u64", "wb") as f_ids, open(tmp / "id_rows.u32", "wb") as f_rows:
+        # Buckets are in hash order already; sort (stably, by row on ties) within each.
+        for bucket in buckets:
+            order = sorted(bucket, key=hashes.__getitem__)
+            array("Q", (hashes[i] for i in order)).tofile(f_ids)
+            array("I", order).tofile(f_rows)
+    with open(tmp / "postings.u32", "wb") as f:
+        flat.tofile(f)
+    meta = {
+        "version": INDEX_VERSION,
+        "byteorder": sys.byteorder,
+        "source": _source_stamp(path),
+        "records": row,
+        "postings": table,
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    # Swap in complete indexes only, so readers never see a partial one.
+    if out.exists():
+        shutil.rmtree(out)
+    os.replace(tmp, out)
+    return out
+
+
+def _index_is_current(path: PathLike) -> bool:
+    try:
+        meta = json.loads((index_dir(path) / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return False
+    return (
+        meta.get("version") == INDEX_VERSION
+        and meta.get("byteorder") == sys.byteorder
+        and meta.get("source") == _source_stamp(path)
+    )
+
+
+class _Mapped:
+    """A read-only memory-mapped file viewed as a typed array (empty files map to an empty view)."""
+
+    def __init__(self, path: Path, fmt: str) -> None:
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.view: Sequence[int] = memoryview(self._mm).cast(fmt) if self._mm is not None else ()
+
+    def close(self) -> None:
+        if isinstance(self.view, memoryview):
+            self.view.release()
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+
+class IndexedJsonl:
+    """
+    Random access to a JSONL dataset through its sidecar index (built, or rebuilt when the data
+    file changed, on open). Records are parsed on demand from a memory map, so lookups by
+    position or id, samples and filtered subsets never scan or load the file.
+
+        with IndexedJsonl("data/train.jsonl") as ds:
+            ds[123]; ds.get(record_id); ds.sample(200, lang="ar"); ds.filter(sport="running")
+    """
+
+    def __init__(self, path: PathLike, *, rebuild: bool = False) -> None:
+        self.path = Path(path)
+        if rebuild or not _index_is_current(self.path):
+            build_index(self.path)
+        d = index_dir(self.path)
+        self.meta = json.loads((d / "meta.json").read_text(encoding="utf-8"))
+        self._maps = [
+            _Mapped(d / "offsets.u64", "Q"),
+            _Mapped(d / "ids.u64", "Q"),
+            _Mapped(d / "id_rows.u32", "I"),
+            _Mapped(d / "postings.u32", "I"),
+        ]
+        self._offsets, self._ids, self._id_rows, self._postings = (m.view for m in self._maps)
+        self._data = _Mapped(self.path, "B")
+
+    def __len__(self) -> int:
+        return int(self.meta["records"])
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        n = len(self)
+        if row < 0:
+            row += n
+        if not 0 <= row < n:
+            raise IndexError(row)
+        return json.loads(self._data.view[self._offsets[row]:self._offsets[row + 1]].tobytes())
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Record with this `id`, or None."""
+        h = _id_hash(record_id)
+        i = bisect.bisect_left(self._ids, h)
+        while i < len(self._ids) and self._ids[i] == h:
+            rec = self[self._id_rows[i]]
+            if str(rec.get("id")) == record_id:
+                return rec
+            i += 1
+        return None
+
+    def values(self, field: str) -> Dict[str, int]:
+        """Distinct values of a posting field (`lang`, `sport`) with their record counts."""
+        return {value: count for value, (_, count) in self.meta["postings"].get(field, {}).items()}
+
+    def rows(self, **filters: str) -> Sequence[int]:
+        """Row numbers matching every `field=value` filter (all rows when none are given)."""
+        if not filters:
+            return range(len(self))
+        lists = []
+        for field, value in filters.items():
+            if field not in POSTING_FIELDS:
+                raise ValueError(f"no postings for {field!r}; indexed fields: {', '.join(POSTING_FIELDS)}")
+            start, count = self.meta["postings"][field].get(str(value), (0, 0))
+            # A compact copy (4 bytes per row), so results stay valid after close().
+            rows = array("I")
+            rows.frombytes(self._postings[start:start + count].tobytes())
+            lists.append(rows)
+        lists.sort(key=len)
+        if len(lists) == 1:
+            return lists[0]
+        keep = set(lists[0])
+        for other in lists[1:]:
+            keep.intersection_update(other)
+        return sorted(keep)
+
+    def filter(self, **filters: str) -> Iterator[Dict[str, Any]]:
+        for row in self.rows(**filters):
+            yield self[row]
+
+    def sample(self, k: int, *, seed: Optional[int] = None, **filters: str) -> List[Dict[str, Any]]:
+        """`k` distinct random records (fewer if fewer match), optionally restricted by filters."""
+        rows = self.rows(**filters)
+        picked = random.Random(seed).sample(range(len(rows)), min(int(k), len(rows)))
+        return [self[rows[i]] for i in picked]
+
+    def close(self) -> None:
+        self._offsets = self._ids = self._id_rows = self._postings = ()
+        for m in self._maps + [self._data]:
+            m.close()
+
+    def __enter__(self) -> "IndexedJsonl":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Build / query the offset index of a JSONL dataset.")
+    ap.add_argument("data", help="JSONL dataset path (the index lives in <data>.idx/).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("build", help="(Re)build the index.")
+    sub.add_parser("stats", help="Record count and values per indexed field.")
+    g = sub.add_parser("get", help="Print records by id.")
+    g.add_argument("ids", nargs="+")
+    s = sub.add_parser("sample", help="Print random records as JSONL.")
+    s.add_argument("k", type=int)
+    s.add_argument("--seed", type=int, default=None)
+    for name in POSTING_FIELDS:
+        s.add_argument(f"--{name}", default=None)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        print(build_index(args.data))
+        return 0
+    with IndexedJsonl(args.data) as ds:
+        if args.cmd == "stats":
+            print(json.dumps({"records": len(ds), **{f: ds.values(f) for f in POSTING_FIELDS}}, ensure_ascii=False, indent=2))
+        elif args.cmd == "get":
+            missing = 0
+            for record_id in args.ids:
+                rec = ds.get(record_id)
+                missing += rec is None
+                print(json.dumps(rec, ensure_ascii=False) if rec is not None else f"not found: {record_id}")
+            return 1 if missing else 0
+        else:
+            filters = {f: getattr(args, f) for f in POSTING_FIELDS if getattr(args, f) is not None}
+            for rec in ds.sample(args.k, seed=args.seed, **filters):
+                print(json.dumps(rec, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
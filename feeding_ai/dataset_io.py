@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+PathLike = Union[str, Path]
+
+_PROFILE_FIELDS = (("height_cm", "float64"), ("weight_kg", "float64"), ("sport", "string"), ("sport_raw", "string"))
+
+
+def _pyarrow() -> Any:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("pyarrow is required for Parquet datasets (pip install pyarrow).") from e
+    return pa, pq
+
+
+def parquet_schema() -> Any:
+    """
+    Records are stored with the completion split into a per-row `completion_head` and a
+    dictionary-encoded `completion_tail`: the long shared part of a plan is kept once per
+    row group and every row only carries a small integer index for it.
+    """
+    pa, _ = _pyarrow()
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("lang", pa.dictionary(pa.int8(), pa.string())),
+            ("prompt", pa.string()),
+            ("profile", pa.struct([(name, getattr(pa, t)()) for name, t in _PROFILE_FIELDS])),
+            ("completion_head", pa.string()),
+            ("completion_tail", pa.dictionary(pa.int32(), pa.string())),
+        ]
+    )
+
+
+def _to_table(rows: List[Dict[str, Any]]) -> Any:
+    pa, _ = _pyarrow()
+    heads, tails = [], []
+    for r in rows:
+        if "completion_head" in r:
+            heads.append(r["completion_head"])
+            tails.append(r.get("completion_tail") or "")
+        else:
+            heads.append(r["completion"])
+            tails.append("")
+    schema = parquet_schema()
+    return pa.table(
+        {
+            "id": pa.array([r["id"] for r in rows], pa.string()),
+            "lang": pa.array([r["lang"] for r in rows], pa.string()).dictionary_encode().cast(schema.field("lang").type),
+            "prompt": pa.array([r["prompt"] for r in rows], pa.string()),
+            "profile": pa.array([r["profile"] for r in rows], schema.field("profile").type),
+            "completion_head": pa.array(heads, pa.string()),
+            "completion_tail": pa.array(tails, pa.string()).dictionary_encode().cast(schema.field("completion_tail").type),
+        },
+        schema=schema,
+    )
+
+
+def write_parquet(rows: Iterable[Dict[str, Any]], path: PathLike, *, batch_size: int = 20000) -> int:
+    """
+    Write dataset records to Parquet. A row may carry `completion_head`/`completion_tail`
+    (preferred, see RuleBasedGenerator.generate_parts) or a plain `completion`.
+    """
+    _, pq = _pyarrow()
+    count = 0
+    with pq.ParquetWriter(str(path), parquet_schema(), compression="zstd") as writer:
+        buf: List[Dict[str, Any]] = []
+        for r in rows:
+            buf.append(r)
+            if len(buf) >= batch_size:
+                writer.write_table(_to_table(buf))
+                count += len(buf)
+                buf = []
+        if buf:
+            writer.write_table(_to_table(buf))
+            count += len(buf)
+    return count
+
+
+def concat_parquet(sources: Iterable[PathLike], path: PathLike) -> None:
+    """Concatenate Parquet shards (written by `write_parquet`) in the given order."""
+    _, pq = _pyarrow()
+    with pq.ParquetWriter(str(path), parquet_schema(), compression="zstd") as writer:
+        for src in sources:
+            pf = pq.ParquetFile(str(src))
+            for i in range(pf.num_row_groups):
+                writer.write_table(pf.read_row_group(i))
+
+
+def read_table(path: PathLike) -> Any:
+    """
+    Load a Parquet dataset as an Arrow table with the JSONL columns, rebuilding `completion`
+    in Arrow (no per-row Python work); suitable for `datasets.Dataset(table)`.
+    """
+    pa, pq = _pyarrow()
+    import pyarrow.compute as pc
+
+    t = pq.read_table(str(path))
+    tails = t.column("completion_tail")
+    tails = pa.chunked_array(
+        [pc.take(chunk.dictionary, chunk.indices) for chunk in tails.chunks],
+        type=pa.string(),
+    )
+    completion = pc.binary_join_element_wise(t.column("completion_head"), tails, "")
+    return pa.table(
+        {
+            "id": t.column("id"),
+            "lang": t.column("lang").cast(pa.string()),
+            "prompt": t.column("prompt"),
+            "profile": t.column("profile"),
+            "completion": completion,
+        }
+    )
+
+
+def _iter_parquet(path: PathLike) -> Iterator[Dict[str, Any]]:
+    _, pq = _pyarrow()
+    pf = pq.ParquetFile(str(path))
+    for i in range(pf.num_row_groups):
+        t = pf.read_row_group(i)
+        tail_col = t.column("completion_tail").combine_chunks()
+        # Decode each distinct tail once, then index into it.
+        tail_values = tail_col.dictionary.to_pylist()
+        tail_idx = tail_col.indices.to_pylist()
+        ids = t.column("id").to_pylist()
+        langs = t.column("lang").to_pylist()
+        prompts = t.column("prompt").to_pylist()
+        profiles = t.column("profile").to_pylist()
+        heads = t.column("completion_head").to_pylist()
+        for j in range(t.num_rows):
+            yield {
+                "id": ids[j],
+                "lang": langs[j],
+                "prompt": prompts[j],
+                "profile": profiles[j],
+                "completion": heads[j] + tail_values[tail_idx[j]],
+            }
+
+
+def _iter_jsonl(path: PathLike) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_records(path: PathLike) -> Iterator[Dict[str, Any]]:
+    """Yield records with the JSONL schema (id, lang, prompt, profile, completion) from .jsonl or .parquet."""
+    if str(path).endswith(".parquet"):
+        return _iter_parquet(path)
+    return _iter_jsonl(path)
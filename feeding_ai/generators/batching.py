@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from .pool import ModelKey, get_pool
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    max_batch_size: int = 8
+    max_wait_ms: float = 10.0
+
+
+@dataclass(frozen=True)
+class BatchCompletion:
+    text: str
+    new_tokens: int
+    queue_ms: float
+    total_ms: float
+    # From submit to the first sampled token (queue wait included, as the caller sees it).
+    ttft_ms: float = 0.0
+    tokenize_ms: float = 0.0
+
+
+@dataclass
+class _Request:
+    prompt: str
+    max_new_tokens: int
+    temperature: float
+    top_p: float
+    future: Future
+    enqueued_at: float
+    seed: Optional[int] = None
+    started_at: float = 0.0
+    first_token_at: float = 0.0
+    tokenize_ms: float = 0.0
+    generated: List[int] = field(default_factory=list)
+    # Per-request torch.Generator when seeded, so the row's samples don't depend on its neighbours.
+    generator: Any = None
+
+
+def _config_from_env() -> SchedulerConfig:
+    def _num(name: str, default: float) -> float:
+        try:
+            return float(os.environ.get(name, "") or default)
+        except ValueError:
+            return default
+
+    return SchedulerConfig(
+        max_batch_size=max(1, int(_num("FEEDING_AI_BATCH_SIZE", 8))),
+        max_wait_ms=max(0.0, _num("FEEDING_AI_BATCH_WAIT_MS", 10.0)),
+    )
+
+
+def sample_tokens(logits: Any, temperature: Any, top_p: Any, generators: Optional[List[Any]] = None) -> Any:
+    """
+    Next token per row with temperature / nucleus (top-p) sampling; rows with temperature 0 are greedy.
+    `generators[i]`, when not None, is the torch.Generator row i samples from (else the global RNG).
+    """
+    import torch
+
+    logits = logits.float()
+    greedy = logits.argmax(-1)
+    probs = torch.softmax(logits / temperature.clamp(min=1e-5)[:, None], dim=-1)
+    sorted_probs, sorted_idx = probs.sort(dim=-1, descending=True)
+    cum = sorted_probs.cumsum(-1)
+    sorted_probs = sorted_probs.masked_fill(cum - sorted_probs > top_p[:, None], 0.0)
+    gens = generators or [None] * logits.shape[0]
+    if all(g is None for g in gens):
+        choice = torch.multinomial(sorted_probs, 1)[:, 0]
+    else:
+        choice = torch.cat([torch.multinomial(sorted_probs[i], 1, generator=g) for i, g in enumerate(gens)])
+    sampled = sorted_idx.gather(-1, choice[:, None])[:, 0]
+    return torch.where(temperature > 0, sampled, greedy)
+
+
+def _to_legacy(past: Any) -> Any:
+    """Per-layer (key, value) tensors from whatever cache object the model returned."""
+    if hasattr(past, "to_legacy_cache"):
+        return past.to_legacy_cache()
+    if hasattr(past, "layers"):
+        return tuple((layer.keys, layer.values) for layer in past.layers)
+    return tuple(past)
+
+
+def _from_legacy(legacy: Any) -> Any:
+    try:
+        from transformers import DynamicCache
+    except Exception:  # pragma: no cover
+        return legacy
+    if hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(legacy)
+    return DynamicCache(legacy)
+
+
+class BatchScheduler:
+    """
+    Iteration-level (continuous) batching for one model.
+    Requests are prefilled together, decoded one token per step as a single batch,
+    retired as soon as they hit EOS/max_new_tokens, and new requests are admitted
+    into the free slots between steps.
+    """
+
+    def __init__(self, key: ModelKey, config: Optional[SchedulerConfig] = None) -> None:
+        self.key = key
+        self.config = config or _config_from_env()
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._queue_ms: Deque[float] = deque(maxlen=1024)
+        self._batch_sizes: Deque[int] = deque(maxlen=1024)
+        self._completed = 0
+        self._steps = 0
+        # running batch
+        self._rows: List[_Request] = []
+        self._cache: Any = None
+        self._mask: Any = None
+        self._pos: Any = None
+        self._last: Any = None
+
+    def submit(
+        self, prompt: str, *, max_new_tokens: int, temperature: float, top_p: float, seed: Optional[int] = None
+    ) -> "Future[BatchCompletion]":
+        fut: "Future[BatchCompletion]" = Future()
+        self._queue.put(
+            _Request(
+                prompt=prompt,
+                max_new_tokens=int(max_new_tokens),
+                temperature=float(temperature),
+                top_p=float(top_p),
+                future=fut,
+                enqueued_at=time.perf_counter(),
+                seed=None if seed is None else int(seed),
+            )
+        )
+        self._ensure_started()
+        return fut
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            q = sorted(self._queue_ms)
+            b = list(self._batch_sizes)
+            completed, steps = self._completed, self._steps
+
+        def _pct(p: float) -> float:
+            return round(q[min(len(q) - 1, int(p * len(q)))], 3) if q else 0.0
+
+        return {
+            "base_model": self.key.base_model,
+            "max_batch_size": self.config.max_batch_size,
+            "max_wait_ms": self.config.max_wait_ms,
+            "pending": self._queue.qsize(),
+            "active": len(self._rows),
+            "completed": completed,
+            "decode_steps": steps,
+            "mean_batch_size": round(sum(b) / len(b), 3) if b else 0.0,
+            "queue_ms_p50": _pct(0.50),
+            "queue_ms_p95": _pct(0.95),
+            "queue_ms_max": round(q[-1], 3) if q else 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batch-{self.key.base_model}", daemon=True)
+                self._thread.start()
+
+    def _admit(self) -> List[_Request]:
+        free = self.config.max_batch_size - len(self._rows)
+        new: List[_Request] = []
+        if free <= 0:
+            return new
+        if not self._rows:
+            new.append(self._queue.get())
+            deadline = time.perf_counter() + self.config.max_wait_ms / 1000.0
+            while len(new) < free:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    new.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+        while len(new) < free:
+            try:
+                new.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return new
+
+    def _run(self) -> None:
+        import torch
+
+        loaded: Any = None
+        while True:
+            new = self._admit()
+            try:
+                # Fetched once when leaving idle and held while any row is active: the pool may evict
+                # the entry meanwhile, but this batch keeps decoding on the same weights.
+                if loaded is None:
+                    loaded = get_pool().get(self.key)
+                tokenizer, model = loaded
+                with torch.no_grad():
+                    if new:
+                        self._prefill(tokenizer, model, new)
+                    if self._rows:
+                        self._step(tokenizer, model)
+            except BaseException as e:
+                pending = {id(r): r for r in self._rows + new}
+                for r in pending.values():
+                    if not r.future.done():
+                        r.future.set_exception(e)
+                self._rows, self._cache, self._mask, self._pos, self._last = [], None, None, None, None
+            if not self._rows:
+                loaded = None
+
+    def _prefill(self, tokenizer: Any, model: Any, new: List[_Request]) -> None:
+        import torch
+
+        now = time.perf_counter()
+        encoded = []
+        for r in new:
+            t0 = time.perf_counter()
+            encoded.append(tokenizer(r.prompt, return_tensors="pt")["input_ids"][0])
+            r.tokenize_ms = (time.perf_counter() - t0) * 1000.0
+        width = max(int(e.shape[0]) for e in encoded)
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else (tokenizer.eos_token_id or 0)
+
+        ids = torch.full((len(new), width), int(pad_id), dtype=torch.long)
+        mask = torch.zeros((len(new), width), dtype=torch.long)
+        for i, e in enumerate(encoded):
+            ids[i, width - e.shape[0]:] = e
+            mask[i, width - e.shape[0]:] = 1
+        positions = (mask.cumsum(-1) - 1).clamp(min=0)
+
+        device = model.device
+        for r in new:
+            if r.seed is not None:
+                r.generator = torch.Generator(device=device).manual_seed(r.seed)
+        out = model(
+            input_ids=ids.to(device),
+            attention_mask=mask.to(device),
+            position_ids=positions.to(device),
+            use_cache=True,
+        )
+        first = self._sample(out.logits[:, -1, :], new)
+        cache = _to_legacy(out.past_key_values)
+        mask = mask.to(device)
+        pos = mask.sum(-1)
+
+        with self._stats_lock:
+            for r in new:
+                r.started_at = now
+                self._queue_ms.append((now - r.enqueued_at) * 1000.0)
+
+        keep = self._collect(tokenizer, new, first)
+        if not keep:
+            return
+        new, cache, mask, pos, first = self._select(keep, new, cache, mask, pos, first)
+        if self._rows:
+            cache, mask = self._merge(self._cache, self._mask, cache, mask)
+            pos = torch.cat([self._pos, pos])
+            first = torch.cat([self._last, first])
+        self._rows = self._rows + new
+        self._cache, self._mask, self._pos, self._last = cache, mask, pos, first
+
+    @staticmethod
+    def _merge(cache_a: Any, mask_a: Any, cache_b: Any, mask_b: Any) -> Any:
+        """Left-pad the shorter cache along the sequence axis and stack both batches."""
+        import torch
+
+        la, lb = mask_a.shape[1], mask_b.shape[1]
+        width = max(la, lb)
+
+        def _pad(t: Any, length: int) -> Any:
+            if length == width:
+                return t
+            shape = list(t.shape)
+            shape[-2 if t.dim() == 4 else -1] = width - length
+            zeros = torch.zeros(shape, dtype=t.dtype, device=t.device)
+            return torch.cat([zeros, t], dim=-2 if t.dim() == 4 else -1)
+
+        merged = tuple(
+            (torch.cat([_pad(ka, la), _pad(kb, lb)]), torch.cat([_pad(va, la), _pad(vb, lb)]))
+            for (ka, va), (kb, vb) in zip(cache_a, cache_b)
+        )
+        return merged, torch.cat([_pad(mask_a, la), _pad(mask_b, lb)])
+
+    def _step(self, tokenizer: Any, model: Any) -> None:
+        import torch
+
+        mask = torch.cat([self._mask, torch.ones_like(self._mask[:, :1])], dim=1)
+        out = model(
+            input_ids=self._last[:, None],
+            attention_mask=mask,
+            position_ids=self._pos[:, None],
+            past_key_values=_from_legacy(self._cache),
+            use_cache=True,
+        )
+        last = self._sample(out.logits[:, -1, :], self._rows)
+        with self._stats_lock:
+            self._steps += 1
+            self._batch_sizes.append(len(self._rows))
+
+        keep = self._collect(tokenizer, self._rows, last)
+        if not keep:
+            self._rows, self._cache, self._mask, self._pos, self._last = [], None, None, None, None
+            return
+        self._rows, self._cache, self._mask, self._pos, self._last = self._select(
+            keep, self._rows, _to_legacy(out.past_key_values), mask, self._pos + 1, last
+        )
+
+    def _collect(self, tokenizer: Any, rows: List[_Request], last: Any) -> List[int]:
+        """Append the sampled tokens, resolve finished requests and return the indices still running."""
+        eos = tokenizer.eos_token_id
+        keep: List[int] = []
+        now = time.perf_counter()
+        for i, r in enumerate(rows):
+            if not r.first_token_at:
+                r.first_token_at = now
+            tok = int(last[i])
+            if tok != eos:
+                r.generated.append(tok)
+            if tok == eos or len(r.generated) >= r.max_new_tokens:
+                done = time.perf_counter()
+                r.future.set_result(
+                    BatchCompletion(
+                        text=tokenizer.decode(r.generated, skip_special_tokens=True).strip(),
+                        new_tokens=len(r.generated),
+                        queue_ms=(r.started_at - r.enqueued_at) * 1000.0,
+                        total_ms=(done - r.enqueued_at) * 1000.0,
+                        ttft_ms=(r.first_token_at - r.enqueued_at) * 1000.0,
+                        tokenize_ms=r.tokenize_ms,
+                    )
+                )
+                with self._stats_lock:
+                    self._completed += 1
+            else:
+                keep.append(i)
+        return keep
+
+    @staticmethod
+    def _select(keep: List[int], rows: List[_Request], cache: Any, mask: Any, pos: Any, last: Any) -> Any:
+        import torch
+
+        if len(keep) == len(rows):
+            return rows, cache, mask, pos, last
+        idx = torch.tensor(keep, dtype=torch.long, device=mask.device)
+        mask = mask.index_select(0, idx)
+        # Drop leading columns that are padding for every remaining row.
+        lead = int((mask.sum(0) == 0).long().cumprod(0).sum())
+        cache = tuple((k.index_select(0, idx)[:, :, lead:], v.index_select(0, idx)[:, :, lead:]) for k, v in cache)
+        return [rows[i] for i in keep], cache, mask[:, lead:], pos.index_select(0, idx), last.index_select(0, idx)
+
+    @staticmethod
+    def _sample(logits: Any, rows: List[_Request]) -> Any:
+        import torch
+
+        temps = torch.tensor([r.temperature for r in rows], dtype=torch.float32, device=logits.device)
+        top_ps = torch.tensor([r.top_p for r in rows], dtype=torch.float32, device=logits.device)
+        return sample_tokens(logits, temps, top_ps, [r.generator for r in rows])
+
+
+_SCHEDULERS: Dict[ModelKey, BatchScheduler] = {}
+_SCHEDULERS_LOCK = threading.Lock()
+
+
+def get_scheduler(key: ModelKey) -> BatchScheduler:
+    """One scheduler per model key; knobs come from FEEDING_AI_BATCH_SIZE / FEEDING_AI_BATCH_WAIT_MS."""
+    with _SCHEDULERS_LOCK:
+        sched = _SCHEDULERS.get(key)
+        if sched is None:
+            sched = BatchScheduler(key)
+            _SCHEDULERS[key] = sched
+        return sched
+
+
+def scheduler_stats() -> List[Dict[str, Any]]:
+    with _SCHEDULERS_LOCK:
+        scheds = list(_SCHEDULERS.values())
+    return [s.stats() for s in scheds]
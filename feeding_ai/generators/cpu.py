@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import warnings
+from typing import Any, Dict, Optional
+
+# `<precision>[+compile]`; int8 = dynamic int8 quantization of nn.Linear on top of fp32 weights.
+CPU_MODES = ("fp32", "bf16", "int8")
+CPU_MODE_PATTERN = r"^(fp32|bf16|int8)(\+compile)?$"
+_DTYPES = {"fp32": "float32", "bf16": "bfloat16", "int8": "float32"}
+
+_THREADS_LOCK = threading.Lock()
+_THREADS_SET = False
+
+
+def parse_mode(mode: str) -> Dict[str, Any]:
+    """`LLMGenerator` overrides for a CPU mode such as `int8`, `bf16` or `fp32+compile`."""
+    m = re.match(CPU_MODE_PATTERN, mode.strip().lower())
+    if m is None:
+        raise ValueError(f"Unknown LLM mode {mode!r}; expected one of {', '.join(CPU_MODES)}, optionally with '+compile'")
+    name = m.group(1)
+    return {
+        "dtype": _DTYPES[name],
+        "device": "cpu",
+        "quantize": "int8" if name == "int8" else None,
+        "compile": bool(m.group(2)),
+    }
+
+
+def resolve_mode(mode: Optional[str] = None) -> Dict[str, Any]:
+    """Overrides for `mode`, else FEEDING_AI_LLM_MODE; empty means the generator defaults (GPU if available)."""
+    mode = (mode or os.environ.get("FEEDING_AI_LLM_MODE", "")).strip()
+    return parse_mode(mode) if mode else {}
+
+
+def set_threads(intra_op: Optional[int] = None, inter_op: Optional[int] = None) -> None:
+    """
+    torch thread pools for CPU inference, process-wide. Defaults come from FEEDING_AI_TORCH_THREADS
+    and FEEDING_AI_TORCH_INTEROP_THREADS (unset = torch's choice). Explicit arguments always apply;
+    the env defaults only on the first call.
+    """
+    global _THREADS_SET
+    with _THREADS_LOCK:
+        if intra_op is None and inter_op is None and _THREADS_SET:
+            return
+        _THREADS_SET = True
+        intra_op = intra_op or _env_int("FEEDING_AI_TORCH_THREADS")
+        inter_op = inter_op or _env_int("FEEDING_AI_TORCH_INTEROP_THREADS")
+        if not intra_op and not inter_op:
+            return
+        import torch
+
+        if intra_op:
+            torch.set_num_threads(intra_op)
+        if inter_op:
+            try:
+                torch.set_num_interop_threads(inter_op)
+            except RuntimeError:
+                # Only settable before the first parallel op; keep whatever is in place.
+                pass
+
+
+def _env_int(name: str) -> Optional[int]:
+    try:
+        value = int(os.environ.get(name, "") or 0)
+    except ValueError:
+        return None
+    return value if value > 0 else None
+
+
+def optimize_for_cpu(model: Any, *, quantize: Optional[str] = None, compile: bool = False) -> Any:
+    """Apply dynamic int8 quantization and/or `torch.compile` to a loaded causal LM."""
+    import torch
+
+    if quantize:
+        if quantize != "int8":
+            raise ValueError(f"Unsupported quantization {quantize!r}; only 'int8' is available")
+        if next(model.parameters()).dtype != torch.float32:
+            raise ValueError("int8 dynamic quantization needs float32 weights")
+        if hasattr(model, "merge_and_unload"):
+            # LoRA layers wrap nn.Linear; fold them in so the quantized layers carry the adapter.
+            model = model.merge_and_unload()
+        with warnings.catch_warnings():
+            # torch.ao eager quantization is flagged as deprecated in favour of torchao; it still works.
+            warnings.filterwarnings("ignore", message=".*deprecated.*")
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if compile:
+        # Dynamic shapes: the prompt length and the KV-cache grow on every call.
+        model.forward = torch.compile(model.forward, dynamic=True)
+    return model
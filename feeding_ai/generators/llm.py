@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import threading
+import time
 from dataclasses import dataclass
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional
 
+from .. import metrics
 from ..lang import Lang
 from ..parser import Profile
+from .pool import ModelKey, get_pool
+from .prefix_cache import encode_with_prefix
+
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Future
+
+    from .batching import BatchCompletion
 
 
 def _system_prompt(lang: str) -> str:
@@ -39,6 +49,60 @@ def _user_prompt(profile: Profile, lang: str) -> str:
     )
 
 
+def _chat_prefix(lang: str) -> str:
+    # Shared by every request in `lang`; its key/values are cached per model (see prefix_cache).
+    return f"<|system|>\n{_system_prompt(lang)}\n<|user|>\n"
+
+
+def _chat_prompt(profile: Profile, lang: str) -> str:
+    # Generic chat formatting; works for many instruct models.
+    return f"{_chat_prefix(lang)}{_user_prompt(profile, lang)}\n<|assistant|>\n"
+
+
+class _FirstTokenTimer:
+    """Minimal `generate(streamer=...)` hook noting when the first new token arrives (put #1 is the prompt)."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.first: Optional[float] = None
+
+    def put(self, value: Any) -> None:
+        self.calls += 1
+        if self.calls == 2:
+            self.first = time.perf_counter()
+
+    def end(self) -> None:
+        pass
+
+
+class _SeededSampler:
+    """
+    `generate(logits_processor=...)` hook that samples each token from its own torch.Generator and
+    leaves only that token finite, so greedy decoding emits it. `generate` has no generator argument,
+    and seeding the global RNG would race with other threads sampling.
+    """
+
+    def __init__(self, seed: int, temperature: float, top_p: float) -> None:
+        self.seed = int(seed)
+        self.temperature = float(temperature)
+        self.top_p = float(top_p)
+        self._generator: Any = None
+
+    def __call__(self, input_ids: Any, scores: Any) -> Any:
+        import torch
+
+        from .batching import sample_tokens
+
+        if self._generator is None:
+            self._generator = torch.Generator(device=scores.device).manual_seed(self.seed)
+        rows = scores.shape[0]
+        temps = torch.full((rows,), self.temperature, dtype=torch.float32, device=scores.device)
+        top_ps = torch.full((rows,), self.top_p, dtype=torch.float32, device=scores.device)
+        tokens = sample_tokens(scores, temps, top_ps, [self._generator] * rows)
+        out = torch.full_like(scores, float("-inf"))
+        return out.scatter_(1, tokens[:, None], 0.0)
+
+
 @dataclass(frozen=True)
 class LLMGenerator:
     """
@@ -50,44 +114,117 @@ class LLMGenerator:
     max_new_tokens: int = 900
     temperature: float = 0.7
     top_p: float = 0.9
-
-    def generate(self, profile: Profile, lang: Lang) -> str:
-        try:
-            from transformers import AutoModelForCausalLM, AutoTokenizer
-            import torch
-        except Exception as e:  # pragma: no cover
-            raise RuntimeError(
-                "Transformers/torch not installed. Install requirements-train.txt or use RuleBasedGenerator."
-            ) from e
-
-        tokenizer = AutoTokenizer.from_pretrained(self.base_model, use_fast=True)
-        model = AutoModelForCausalLM.from_pretrained(
-            self.base_model,
-            torch_dtype=getattr(torch, "float16", None),
-            device_map="auto",
+    dtype: str = "float16"
+    device: str = "auto"
+    adapter: Optional[str] = None
+    # CPU inference: "int8" = dynamic quantization of Linear layers (float32 only); see generators.cpu.
+    quantize: Optional[str] = None
+    compile: bool = False
+    # Per-request sampling seed (own torch.Generator, global RNG untouched); part of the output cache key.
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_spec(cls, spec: str, mode: Optional[str] = None, **kwargs: Any) -> "LLMGenerator":
+        """
+        Generator for `MODEL` or `MODEL@ADAPTER` (LoRA adapter path), in CPU `mode`
+        (default FEEDING_AI_LLM_MODE; see generators.cpu).
+        """
+        from .cpu import resolve_mode
+
+        base_model, _, adapter = spec.partition("@")
+        return cls(base_model=base_model.strip(), adapter=adapter.strip() or None, **resolve_mode(mode), **kwargs)
+
+    @property
+    def model_key(self) -> ModelKey:
+        return ModelKey(
+            base_model=self.base_model,
+            dtype=self.dtype,
+            device=self.device,
+            adapter=self.adapter,
+            quantize=self.quantize,
+            compile=self.compile,
         )
 
-        system = _system_prompt(lang.code)
-        user = _user_prompt(profile, lang.code)
-
-        # Generic chat formatting; works for many instruct models.
-        prompt = f"<|system|>\n{system}\n<|user|>\n{user}\n<|assistant|>\n"
-        inputs = tokenizer(prompt, return_tensors="pt")
-        inputs = {k: v.to(model.device) for k, v in inputs.items()}
-
+    def generate(self, profile: Profile, lang: Lang) -> str:
+        # Loaded once per process and shared by all generators with the same key.
+        with metrics.stage("model_load"):
+            tokenizer, model = get_pool().get(self.model_key)
+        import torch
+
+        inputs = encode_with_prefix(tokenizer, model, _chat_prompt(profile, lang.code), _chat_prefix(lang.code))
+
+        kwargs = self._sampling_kwargs(tokenizer)
+        timer = _FirstTokenTimer() if metrics.enabled() else None
+        if timer is not None:
+            kwargs["streamer"] = timer
+        t0 = time.perf_counter()
         with torch.no_grad():
-            out = model.generate(
-                **inputs,
-                max_new_tokens=int(self.max_new_tokens),
-                do_sample=True,
-                temperature=float(self.temperature),
-                top_p=float(self.top_p),
-                eos_token_id=tokenizer.eos_token_id,
-            )
-
-        text = tokenizer.decode(out[0], skip_special_tokens=True)
+            out = model.generate(**inputs, **kwargs)
+        if timer is not None:
+            decode_s = time.perf_counter() - t0
+            metrics.record_stage("decode", decode_s)
+            ttft = timer.first - t0 if timer.first is not None else None
+            metrics.observe_llm(int(out.shape[-1] - inputs["input_ids"].shape[-1]), decode_s, ttft)
+
+        with metrics.stage("detokenize"):
+            text = tokenizer.decode(out[0], skip_special_tokens=True)
         # Return only assistant continuation when possible
         if "<|assistant|>" in text:
             return text.split("<|assistant|>", 1)[-1].strip()
         return text.strip()
 
+    def stream(self, profile: Profile, lang: Lang) -> Iterator[str]:
+        """Yield decoded text pieces as tokens are produced (generation runs in a helper thread)."""
+        with metrics.stage("model_load"):
+            tokenizer, model = get_pool().get(self.model_key)
+        import torch
+        from transformers import TextIteratorStreamer
+
+        inputs = encode_with_prefix(tokenizer, model, _chat_prompt(profile, lang.code), _chat_prefix(lang.code))
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors: list = []
+
+        def _run() -> None:
+            try:
+                with torch.no_grad():
+                    model.generate(**inputs, streamer=streamer, **self._sampling_kwargs(tokenizer))
+            except BaseException as e:
+                errors.append(e)
+                streamer.end()
+
+        worker = threading.Thread(target=_run, daemon=True)
+        t0 = time.perf_counter()
+        first = None
+        worker.start()
+        for piece in streamer:
+            if piece:
+                if first is None:
+                    first = time.perf_counter() - t0
+                yield piece
+        worker.join()
+        if metrics.enabled():
+            metrics.record_stage("decode", time.perf_counter() - t0)
+            if first is not None:
+                metrics.observe("feeding_ai_llm_ttft_seconds", first)
+        if errors:
+            raise errors[0]
+
+    def _sampling_kwargs(self, tokenizer: Any) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"max_new_tokens": int(self.max_new_tokens), "eos_token_id": tokenizer.eos_token_id}
+        if self.seed is not None:
+            kwargs.update(do_sample=False, logits_processor=[_SeededSampler(self.seed, self.temperature, self.top_p)])
+        else:
+            kwargs.update(do_sample=True, temperature=float(self.temperature), top_p=float(self.top_p))
+        return kwargs
+
+    def submit(self, profile: Profile, lang: Lang) -> "Future[BatchCompletion]":
+        """Queue the request on the shared continuous-batching scheduler for this model."""
+        from .batching import get_scheduler
+
+        return get_scheduler(self.model_key).submit(
+            _chat_prompt(profile, lang.code),
+            max_new_tokens=self.max_new_tokens,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            seed=self.seed,
+        )
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from ..lang import Lang
+from ..parser import Profile
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .llm import LLMGenerator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def canonical_key(profile: Profile, lang: Lang, gen: "LLMGenerator") -> Dict[str, Any]:
+    """
+    Everything that determines an LLM plan. Height/weight are rounded to whole cm/kg so
+    near-identical profiles share an entry. Without a seed (`None`) the first sampled plan is
+    reused for the profile; a seeded request gets its own, reproducible entry.
+    """
+    return {
+        "lang": lang.code,
+        "height_cm": int(round(profile.height_cm)),
+        "weight_kg": int(round(profile.weight_kg)),
+        "sport": profile.sport,
+        "model": gen.base_model,
+        "adapter": gen.adapter,
+        "dtype": gen.dtype,
+        "max_new_tokens": int(gen.max_new_tokens),
+        "temperature": float(gen.temperature),
+        "top_p": float(gen.top_p),
+        "seed": gen.seed,
+        "quantize": gen.quantize,
+    }
+
+
+# Reads write nothing unless an entry's LRU timestamp is older than this (or a counter flush is due).
+TOUCH_INTERVAL_S = 60.0
+COUNTER_FLUSH_S = 5.0
+
+
+class OutputCache:
+    """
+    SQLite-backed cache of generated plans, safe to share between processes (WAL mode).
+    Entries expire after `ttl_seconds`; least recently used entries are evicted once the
+    stored text exceeds `max_bytes`. Hit/miss counters are summed in memory and added to the
+    database every COUNTER_FLUSH_S, so they cover every process using the file.
+    """
+
+    def __init__(self, path: str, *, ttl_seconds: float = 7 * 86400, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.path = str(path)
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = int(max_bytes)
+        self._local = threading.local()
+        self._counts: Dict[str, int] = {}
+        self._counts_lock = threading.Lock()
+        self._counts_pid = os.getpid()
+        self._flushed = time.monotonic()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after fork (SQLite handles must not cross processes).
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def digest(key: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(key, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def _count(self, name: str) -> None:
+        with self._counts_lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            due = time.monotonic() - self._flushed >= COUNTER_FLUSH_S
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add the counters accumulated in this process to the database (one transaction)."""
+        with self._counts_lock:
+            if self._counts_pid != os.getpid():
+                # Inherited over fork: the parent reports those.
+                self._counts, self._counts_pid = {}, os.getpid()
+            counts, self._counts = self._counts, {}
+            self._flushed = time.monotonic()
+        if not counts:
+            return
+        self._conn().executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            list(counts.items()),
+        )
+
+    def get(self, key: Dict[str, Any]) -> Optional[str]:
+        digest = self.digest(key)
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, created, accessed FROM entries WHERE key = ?", (digest,)).fetchone()
+        if row is not None and self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+            conn.execute("DELETE FROM entries WHERE key = ?", (digest,))
+            self._count("expired")
+            row = None
+        if row is None:
+            self._count("misses")
+            return None
+        # Eviction only needs a coarse LRU order; refreshing on every hit would make each read a write.
+        if now - row[2] >= TOUCH_INTERVAL_S:
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, digest))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key: Dict[str, Any], value: str) -> None:
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+                (self.digest(key), value, now, now, size),
+            )
+            if self.max_bytes > 0:
+                self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until back under budget.
+        freed, victims = 0, []
+        for digest, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((digest,))
+            freed += size
+        conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (len(victims),),
+        )
+
+    def clear(self) -> None:
+        with self._counts_lock:
+            self._counts = {}
+        conn = self._conn()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM counters")
+
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": hits,
+            "misses": misses,
+            "expired": counters.get("expired", 0),
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+
+_CACHE: Optional[OutputCache] = None
+_CACHE_LOADED = False
+_CACHE_LOCK = threading.Lock()
+
+
+def get_output_cache() -> Optional[OutputCache]:
+    """
+    Shared cache from FEEDING_AI_LLM_CACHE (SQLite path; unset = disabled),
+    FEEDING_AI_LLM_CACHE_TTL_S (default 7 days) and FEEDING_AI_LLM_CACHE_MB (default 256).
+    """
+    global _CACHE, _CACHE_LOADED
+    if not _CACHE_LOADED:
+        with _CACHE_LOCK:
+            if not _CACHE_LOADED:
+                path = os.environ.get("FEEDING_AI_LLM_CACHE", "").strip()
+                if path:
+                    _CACHE = OutputCache(
+                        path,
+                        ttl_seconds=_float_env("FEEDING_AI_LLM_CACHE_TTL_S", 7 * 86400),
+                        max_bytes=int(_float_env("FEEDING_AI_LLM_CACHE_MB", 256) * 1024 * 1024),
+                    )
+                _CACHE_LOADED = True
+    return _CACHE
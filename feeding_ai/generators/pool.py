@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class ModelKey:
+    base_model: str
+    dtype: str = "float16"
+    device: str = "auto"
+    adapter: Optional[str] = None
+    quantize: Optional[str] = None
+    compile: bool = False
+
+
+@dataclass
+class _Entry:
+    tokenizer: Any
+    model: Any
+    size_bytes: int
+    load_seconds: float
+
+
+def _budget_from_env() -> int:
+    raw = os.environ.get("FEEDING_AI_MODEL_POOL_MB", "").strip()
+    try:
+        return max(0, int(float(raw) * 1024 * 1024)) if raw else 0
+    except ValueError:
+        return 0
+
+
+def _model_size_bytes(model: Any) -> int:
+    # The state dict also covers packed int8 weights, which are not parameters; tied weights count once.
+    total, seen = 0, set()
+    try:
+        stack = list(model.state_dict().values())
+        while stack:
+            t = stack.pop()
+            if isinstance(t, (tuple, list)):
+                stack.extend(t)
+                continue
+            if not hasattr(t, "element_size") or (t.data_ptr(), t.numel()) in seen:
+                continue
+            seen.add((t.data_ptr(), t.numel()))
+            total += int(t.numel()) * int(t.element_size())
+    except Exception:  # pragma: no cover
+        return 0
+    return total
+
+
+def _low_cpu_mem_supported() -> bool:
+    # transformers 4.x needs accelerate for low_cpu_mem_usage; 5.x always loads this way.
+    import importlib.util
+
+    import transformers
+
+    return int(transformers.__version__.split(".", 1)[0]) >= 5 or importlib.util.find_spec("accelerate") is not None
+
+
+def _dtype_kwarg() -> str:
+    # `dtype` replaced `torch_dtype` in transformers 4.56; older releases only know the old name.
+    import transformers
+
+    major, minor = (int(p) for p in transformers.__version__.split(".")[:2])
+    return "dtype" if (major, minor) >= (4, 56) else "torch_dtype"
+
+
+_IMPORT_LOCK = threading.Lock()
+_BACKEND: Optional[Tuple[Any, Any, Any]] = None
+
+
+def _backend() -> Tuple[Any, Any, Any]:
+    """
+    (AutoModelForCausalLM, AutoTokenizer, torch), imported once. transformers resolves these
+    names lazily and is not safe to import from two threads at once, so cold loads of different
+    keys (which hold different single-flight locks) serialize here and nowhere else.
+    """
+    global _BACKEND
+    with _IMPORT_LOCK:
+        if _BACKEND is None:
+            try:
+                from transformers import AutoModelForCausalLM, AutoTokenizer
+                import torch
+            except ImportError as e:  # pragma: no cover
+                raise RuntimeError(
+                    "Transformers/torch not installed. Install requirements-train.txt or use RuleBasedGenerator."
+                ) from e
+            _BACKEND = (AutoModelForCausalLM, AutoTokenizer, torch)
+        return _BACKEND
+
+
+def _load(key: ModelKey) -> Tuple[Any, Any]:
+    AutoModelForCausalLM, AutoTokenizer, torch = _backend()
+
+    tokenizer = AutoTokenizer.from_pretrained(key.base_model, use_fast=True)
+    kwargs: Dict[str, Any] = {_dtype_kwarg(): getattr(torch, key.dtype, None)}
+    if _low_cpu_mem_supported():
+        # Safetensors checkpoints are memory-mapped and copied tensor by tensor into an empty model,
+        # so peak RSS stays near one copy of the weights instead of two.
+        kwargs["low_cpu_mem_usage"] = True
+    if key.device == "cpu":
+        from .cpu import set_threads
+
+        # Plain CPU load: no accelerate dispatch hooks, which also get in the way of quantization.
+        set_threads()
+    else:
+        kwargs["device_map"] = key.device
+    model = AutoModelForCausalLM.from_pretrained(key.base_model, **kwargs)
+    if key.adapter:
+        with _IMPORT_LOCK:
+            from peft import PeftModel
+
+        model = PeftModel.from_pretrained(model, key.adapter)
+    model.eval()
+    if key.quantize or key.compile:
+        from .cpu import optimize_for_cpu
+
+        model = optimize_for_cpu(model, quantize=key.quantize, compile=key.compile)
+    return tokenizer, model
+
+
+class ModelPool:
+    """
+    Process-wide cache of (tokenizer, model) pairs keyed by ModelKey.
+    Each key is loaded at most once even under concurrent requests; least recently
+    used models are dropped when the resident size exceeds `budget_bytes` (0 = unbounded).
+    """
+
+    def __init__(self, budget_bytes: int = 0) -> None:
+        self.budget_bytes = int(budget_bytes)
+        self._entries: "OrderedDict[ModelKey, _Entry]" = OrderedDict()
+        self._loading: Dict[ModelKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load_seconds = 0.0
+
+    def get(self, key: ModelKey) -> Tuple[Any, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry.tokenizer, entry.model
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Single-flight: concurrent callers for the same key wait for one load.
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry.tokenizer, entry.model
+                self._misses += 1
+
+            t0 = time.perf_counter()
+            tokenizer, model = _load(key)
+            elapsed = time.perf_counter() - t0
+            entry = _Entry(tokenizer, model, _model_size_bytes(model), elapsed)
+
+            with self._lock:
+                self._load_seconds += elapsed
+                self._entries[key] = entry
+                self._evict_locked(keep=key)
+                self._loading.pop(key, None)
+            return tokenizer, model
+
+    def _evict_locked(self, keep: ModelKey) -> None:
+        if self.budget_bytes <= 0:
+            return
+        while self.resident_bytes() > self.budget_bytes:
+            victim = next((k for k in self._entries if k != keep), None)
+            if victim is None:
+                break
+            del self._entries[victim]
+            self._evictions += 1
+
+    def resident_bytes(self) -> int:
+        return sum(e.size_bytes for e in self._entries.values())
+
+    def contains(self, key: ModelKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "load_seconds_total": round(self._load_seconds, 3),
+                "resident_bytes": self.resident_bytes(),
+                "budget_bytes": self.budget_bytes,
+                "models": [
+                    {
+                        "base_model": k.base_model,
+                        "dtype": k.dtype,
+                        "device": k.device,
+                        "adapter": k.adapter,
+                        "quantize": k.quantize,
+                        "compile": k.compile,
+                        "size_bytes": e.size_bytes,
+                        "load_seconds": round(e.load_seconds, 3),
+                    }
+                    for k, e in self._entries.items()
+                ],
+            }
+
+
+_POOL: Optional[ModelPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ModelPool:
+    """Shared pool; budget comes from FEEDING_AI_MODEL_POOL_MB (unset = unbounded)."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ModelPool(budget_bytes=_budget_from_env())
+    return _POOL
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .. import metrics
+from .batching import _from_legacy, _to_legacy
+
+
+@dataclass(frozen=True)
+class _Prefix:
+    text: str
+    ids: Any  # 1-D LongTensor on CPU
+    past: Any  # per-layer (key, value) tensors for `ids`
+
+
+def _enabled() -> bool:
+    return os.environ.get("FEEDING_AI_PREFIX_CACHE", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+# Keyed by the model object, so entries go away when the model pool drops a model.
+_PREFIXES: "weakref.WeakKeyDictionary[Any, Dict[str, _Prefix]]" = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "mismatches": 0}
+
+
+def _prefix(tokenizer: Any, model: Any, text: str) -> _Prefix:
+    with _LOCK:
+        entry = _PREFIXES.get(model, {}).get(text)
+    if entry is not None:
+        return entry
+
+    import torch
+
+    with metrics.stage("prefix_prefill"):
+        ids = tokenizer(text, return_tensors="pt")["input_ids"][0]
+        with torch.no_grad():
+            out = model(input_ids=ids[None].to(model.device), use_cache=True)
+        entry = _Prefix(text=text, ids=ids, past=_to_legacy(out.past_key_values))
+    with _LOCK:
+        _STATS["misses"] += 1
+        return _PREFIXES.setdefault(model, {}).setdefault(text, entry)
+
+
+def encode_with_prefix(tokenizer: Any, model: Any, prompt: str, prefix: str) -> Dict[str, Any]:
+    """
+    `generate()` inputs for `prompt`. When it starts with `prefix` and the prefix tokenizes
+    identically on its own, the prefix's key/values are passed as `past_key_values` so only
+    the remaining tokens are prefilled; otherwise the plain encoded prompt is returned.
+    """
+    with metrics.stage("tokenize"):
+        inputs = tokenizer(prompt, return_tensors="pt")
+        inputs = {k: v.to(model.device) for k, v in inputs.items()}
+    if not _enabled() or not prompt.startswith(prefix):
+        return inputs
+
+    entry = _prefix(tokenizer, model, prefix)
+    ids = inputs["input_ids"][0]
+    n = int(entry.ids.shape[0])
+    if n >= int(ids.shape[0]) or not bool((ids[:n].cpu() == entry.ids).all()):
+        # The tokenizer merged across the boundary; a partial reuse would change the output.
+        with _LOCK:
+            _STATS["mismatches"] += 1
+        return inputs
+    with _LOCK:
+        _STATS["hits"] += 1
+    # A fresh cache object per call: generation appends to it, the stored tensors stay untouched.
+    inputs["past_key_values"] = _from_legacy(entry.past)
+    return inputs
+
+
+def prefix_cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        return {**_STATS, "models": len(_PREFIXES), "entries": sum(len(v) for v in _PREFIXES.values())}
+
+
+def clear_prefix_cache(model: Optional[Any] = None) -> None:
+    with _LOCK:
+        if model is None:
+            _PREFIXES.clear()
+        else:
+            _PREFIXES.pop(model, None)
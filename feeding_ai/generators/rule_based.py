@@ -1,10 +1,14 @@
 from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, Tuple
+from .. import metrics
 from ..lang import Lang
-from ..nutrition import estimate_daily_targets, meal_templates, nutrient_examples, sport_type
+from ..nutrition import estimate_daily_targets, sport_type
 from ..parser import Profile
-from ..workouts import build_workout_plans
+from ..plan import Plan, static_content
 
 
 def _bmi(height_cm: float, weight_kg: float) -> float:
@@ -23,39 +27,62 @@ def _sport_type_label(lang: str, st: str) -> str:
     return st
 
 
+_SPORT_LABELS_AR = {
+    "football": "كرة قدم",
+    "basketball": "كرة سلة",
+    "swimming": "سباحة",
+    "running": "جري",
+    "cycling": "دراجة",
+    "tennis": "تنس",
+    "volleyball": "كرة طائرة",
+    "martial_arts": "فنون قتالية",
+    "gym_strength": "جيم/حديد",
+    "crossfit": "كروسفت",
+    "yoga": "يوغا",
+    "fitness": "لياقة عامة",
+}
+
+_SPORT_LABELS_EN = {
+    "football": "football (soccer)",
+    "basketball": "basketball",
+    "swimming": "swimming",
+    "running": "running",
+    "cycling": "cycling",
+    "tennis": "tennis",
+    "volleyball": "volleyball",
+    "martial_arts": "martial arts",
+    "gym_strength": "gym/strength training",
+    "crossfit": "crossfit",
+    "yoga": "yoga",
+    "fitness": "general fitness",
+}
+
+
 def _sport_label(lang: str, sport_key: str, sport_raw: str) -> str:
     if lang == "ar":
-        mapping = {
-            "football": "كرة قدم",
-            "basketball": "كرة سلة",
-            "swimming": "سباحة",
-            "running": "جري",
-            "cycling": "دراجة",
-            "tennis": "تنس",
-            "volleyball": "كرة طائرة",
-            "martial_arts": "فنون قتالية",
-            "gym_strength": "جيم/حديد",
-            "crossfit": "كروسفت",
-            "yoga": "يوغا",
-            "fitness": "لياقة عامة",
-        }
-        return mapping.get(sport_key, sport_raw)
-
-    mapping = {
-        "football": "football (soccer)",
-        "basketball": "basketball",
-        "swimming": "swimming",
-        "running": "running",
-        "cycling": "cycling",
-        "tennis": "tennis",
-        "volleyball": "volleyball",
-        "martial_arts": "martial arts",
-        "gym_strength": "gym/strength training",
-        "crossfit": "crossfit",
-        "yoga": "yoga",
-        "fitness": "general fitness",
-    }
-    return mapping.get(sport_key, sport_raw)
+        return _SPORT_LABELS_AR.get(sport_key, sport_raw)
+    return _SPORT_LABELS_EN.get(sport_key, sport_raw)
+
+
+def _output_cache_size_from_env() -> int:
+    try:
+        return max(0, int(os.environ.get("FEEDING_AI_PLAN_CACHE_SIZE", "0") or 0))
+    except ValueError:
+        return 0
+
+
+_OUTPUT_CACHE: "OrderedDict[tuple, str]" = OrderedDict()
+_OUTPUT_CACHE_LOCK = threading.Lock()
+_OUTPUT_CACHE_SIZE = _output_cache_size_from_env()
+
+
+def set_output_cache_size(size: int) -> None:
+    """Bound the LRU of full rendered plans (0 disables it)."""
+    global _OUTPUT_CACHE_SIZE
+    with _OUTPUT_CACHE_LOCK:
+        _OUTPUT_CACHE_SIZE = max(0, int(size))
+        while len(_OUTPUT_CACHE) > _OUTPUT_CACHE_SIZE:
+            _OUTPUT_CACHE.popitem(last=False)
 
 
 @dataclass(frozen=True)
@@ -66,105 +93,58 @@ class RuleBasedGenerator:
     - Also used to synthesize training data for SFT/LoRA.
     """
 
-    def generate(self, profile: Profile, lang: Lang) -> str:
+    def build_plan(self, profile: Profile, lang: Lang) -> Plan:
+        """Structured plan; render with `to_markdown()` (== `generate()`), `to_dict()` or `to_html()`."""
         lang_code = lang.code
-        targets = estimate_daily_targets(profile)
-        bmi = _bmi(profile.height_cm, profile.weight_kg)
         st = sport_type(profile.sport)
-        st_label = _sport_type_label(lang_code, st)
-
-        sport_name = _sport_label(lang_code, profile.sport, profile.sport_raw)
-        meals = meal_templates(lang_code)
-        ex = nutrient_examples(lang_code)
-        workout_plans = build_workout_plans(lang_code, profile.sport)
-
-        if lang_code == "ar":
-            lines: List[str] = []
-            lines.append("## خطة غذائية + تمارين (مولّدة تلقائيًا)")
-            lines.append("")
-            lines.append("### بياناتك")
-            lines.append(f"- **الطول**: {profile.height_cm:.0f} سم")
-            lines.append(f"- **الوزن**: {profile.weight_kg:.1f} كجم")
-            lines.append(f"- **الرياضة**: {sport_name}")
-            lines.append(f"- **BMI تقريبي**: {bmi:.1f}")
-            lines.append("")
-            lines.append("### أهداف يومية (تقديرية)")
-            lines.append(f"- **السعرات**: {targets.calories_kcal} kcal/يوم")
-            lines.append(f"- **بروتين**: {targets.protein_g} g")
-            lines.append(f"- **كربوهيدرات**: {targets.carbs_g} g")
-            lines.append(f"- **دهون**: {targets.fats_g} g")
-            lines.append(f"- **مياه**: {targets.water_liters:.1f} لتر (زود مع التعرّق)")
-            lines.append("")
-            lines.append("### 3 وجبات (مكوّنات + عناصر غذائية + أمثلة)")
-            for meal in meals:
-                lines.append(f"#### {meal.name}")
-                for c in meal.components:
-                    lines.append(f"- {c}")
-                lines.append(f"- **تركيز عناصر**: {', '.join(meal.nutrients_focus)}")
-                lines.append("")
-            lines.append("### أمثلة منتجات/أطعمة حسب العنصر")
-            for k, items in ex.items():
-                lines.append(f"- **{k}**: " + "، ".join(items))
-            lines.append("")
-            lines.append("### تمارين مقترحة (جيم + منزل)")
-            lines.append(f"- **نمط رياضي مستنتج**: {st_label}")
-            for wp in workout_plans:
-                lines.append(f"#### {wp.title}")
-                for d in wp.days:
-                    lines.append(f"- {d}")
-                if wp.notes:
-                    lines.append("- **ملاحظات**:")
-                    for n in wp.notes:
-                        lines.append(f"  - {n}")
-                lines.append("")
-            lines.append("### ملاحظات سريعة للتعافي")
-            lines.append("- نوم 7-9 ساعات.")
-            lines.append("- بعد التمرين: وجبة فيها بروتين + كربوهيدرات خلال 1-3 ساعات.")
-            lines.append("- لو هدفك تخسيس/زيادة وزن: قلّل/زوّد 200-300 kcal وراقب التغيير أسبوعيًا.")
-            return "\n".join(lines)
-
-        # English
-        lines = []
-        lines.append("## Auto-generated Nutrition + Training Plan")
-        lines.append("")
-        lines.append("### Your profile")
-        lines.append(f"- **Height**: {profile.height_cm:.0f} cm")
-        lines.append(f"- **Weight**: {profile.weight_kg:.1f} kg")
-        lines.append(f"- **Sport**: {sport_name}")
-        lines.append(f"- **Estimated BMI**: {bmi:.1f}")
-        lines.append("")
-        lines.append("### Daily targets (estimated)")
-        lines.append(f"- **Calories**: {targets.calories_kcal} kcal/day")
-        lines.append(f"- **Protein**: {targets.protein_g} g")
-        lines.append(f"- **Carbs**: {targets.carbs_g} g")
-        lines.append(f"- **Fats**: {targets.fats_g} g")
-        lines.append(f"- **Water**: {targets.water_liters:.1f} L (increase with sweating)")
-        lines.append("")
-        lines.append("### 3 meals (ingredients + nutrients + examples)")
-        for meal in meals:
-            lines.append(f"#### {meal.name}")
-            for c in meal.components:
-                lines.append(f"- {c}")
-            lines.append(f"- **Nutrient focus**: {', '.join(meal.nutrients_focus)}")
-            lines.append("")
-        lines.append("### Food examples by nutrient")
-        for k, items in ex.items():
-            lines.append(f"- **{k}**: " + ", ".join(items))
-        lines.append("")
-        lines.append("### Suggested workouts (Gym + Home)")
-        lines.append(f"- **Inferred sport type**: {st_label}")
-        for wp in workout_plans:
-            lines.append(f"#### {wp.title}")
-            for d in wp.days:
-                lines.append(f"- {d}")
-            if wp.notes:
-                lines.append("- **Notes**:")
-                for n in wp.notes:
-                    lines.append(f"  - {n}")
-            lines.append("")
-        lines.append("### Quick recovery notes")
-        lines.append("- Sleep 7-9 hours.")
-        lines.append("- Post-workout: protein + carbs within 1-3 hours.")
-        lines.append("- For fat loss/gain: adjust +/-200-300 kcal and track weekly.")
-        return "\n".join(lines)
+        meals, examples, workouts, notes = static_content(lang_code, st)
+        with metrics.stage("targets"):
+            targets = estimate_daily_targets(profile)
+        return Plan(
+            lang=lang_code,
+            profile=profile,
+            sport_name=_sport_label(lang_code, profile.sport, profile.sport_raw),
+            sport_type=st,
+            sport_type_label=_sport_type_label(lang_code, st),
+            bmi=_bmi(profile.height_cm, profile.weight_kg),
+            targets=targets,
+            meals=meals,
+            nutrient_examples=examples,
+            workout_plans=workouts,
+            notes=notes,
+        )
+
+    def generate(self, profile: Profile, lang: Lang) -> str:
+        if _OUTPUT_CACHE_SIZE <= 0:
+            plan = self.build_plan(profile, lang)
+            with metrics.stage("render"):
+                return plan.to_markdown()
+
+        sport_name = _sport_label(lang.code, profile.sport, profile.sport_raw)
+        key = (lang.code, profile.height_cm, profile.weight_kg, profile.sport, sport_name)
+        with _OUTPUT_CACHE_LOCK:
+            out = _OUTPUT_CACHE.get(key)
+            if out is not None:
+                _OUTPUT_CACHE.move_to_end(key)
+                return out
+        plan = self.build_plan(profile, lang)
+        with metrics.stage("render"):
+            out = plan.to_markdown()
+        with _OUTPUT_CACHE_LOCK:
+            _OUTPUT_CACHE[key] = out
+            while len(_OUTPUT_CACHE) > _OUTPUT_CACHE_SIZE:
+                _OUTPUT_CACHE.popitem(last=False)
+        return out
+
+    def generate_parts(self, profile: Profile, lang: Lang) -> Tuple[str, str]:
+        """
+        (head, tail) with head + tail == generate(). The head holds the per-profile blocks;
+        the tail depends only on (lang, sport type), so datasets can store it once.
+        """
+        return self.build_plan(profile, lang).markdown_parts()
 
+    def stream(self, profile: Profile, lang: Lang) -> Iterator[str]:
+        """Yield the plan one `###` section at a time; the chunks concatenate to `generate()`."""
+        sections = self.build_plan(profile, lang).markdown_sections()
+        for i, sec in enumerate(sections):
+            yield sec + ("\n" if i < len(sections) - 1 else "")
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import re
+import threading
 from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
 
-try:
-    from langdetect import DetectorFactory, detect  # type: ignore
 
-    DetectorFactory.seed = 42
-except Exception:  # pragma: no cover
-    detect = None  # type: ignore
+_ARABIC_RE = re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]")
+_LATIN_RE = re.compile(r"[A-Za-z\u00C0-\u024F]")
 
+# Only messages up to this length are memoized, so the cache holds at most 4096 short strings.
+_CACHE_MAX_CHARS = 512
 
-_ARABIC_RE = re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]")
+_LANGDETECT: Optional[Any] = None
+_LANGDETECT_LOADED = False
+_LANGDETECT_LOCK = threading.Lock()
 
 
 @dataclass(frozen=True)
@@ -19,14 +23,65 @@ class Lang:
     code: str  # "ar" | "en"
 
 
-def detect_lang(text: str) -> Lang:
-    if _ARABIC_RE.search(text or ""):
-        return Lang("ar")
+def _langdetect() -> Optional[Any]:
+    """Import langdetect on first ambiguous input only; its profiles are slow to load."""
+    global _LANGDETECT, _LANGDETECT_LOADED
+    if not _LANGDETECT_LOADED:
+        with _LANGDETECT_LOCK:
+            if not _LANGDETECT_LOADED:
+                try:
+                    from langdetect import DetectorFactory, detect  # type: ignore
+
+                    DetectorFactory.seed = 42
+                    _LANGDETECT = detect
+                except Exception:  # pragma: no cover
+                    _LANGDETECT = None
+                _LANGDETECT_LOADED = True
+    return _LANGDETECT
+
+
+def _script_guess(text: str) -> Optional[str]:
+    # Any Arabic-script character wins; Latin letters without Arabic can only come out as "en".
+    if _ARABIC_RE.search(text):
+        return "ar"
+    if _LATIN_RE.search(text):
+        return "en"
+    return None
+
+
+def _detect(text: str) -> Lang:
+    code = _script_guess(text)
+    if code is not None:
+        return Lang(code)
     try:
+        detect = _langdetect()
         if detect is None:
             return Lang("en")
-        code = detect(text)  # type: ignore[misc]
+        code = detect(text)
         return Lang("ar" if str(code).startswith("ar") else "en")
     except Exception:
         return Lang("en")
 
+
+_detect_cached = lru_cache(maxsize=4096)(_detect)
+
+
+def _detect_one(text: str) -> Lang:
+    return _detect_cached(text) if len(text) <= _CACHE_MAX_CHARS else _detect(text)
+
+
+def detect_lang(text: str) -> Lang:
+    return _detect_one(text or "")
+
+
+def detect_langs_batch(texts: Iterable[str]) -> List[Lang]:
+    """Detect many messages at once; duplicates within the batch are resolved once."""
+    seen: Dict[str, Lang] = {}
+    out: List[Lang] = []
+    for t in texts:
+        t = t or ""
+        lang = seen.get(t)
+        if lang is None:
+            lang = seen[t] = _detect_one(t)
+        out.append(lang)
+    return out
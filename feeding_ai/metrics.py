@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans sub-millisecond rule-based stages up to multi-minute model loads.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+RATE_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_HELP = {
+    "feeding_ai_stage_seconds": ("histogram", "Time spent per pipeline stage."),
+    "feeding_ai_llm_ttft_seconds": ("histogram", "LLM time to first generated token."),
+    "feeding_ai_llm_tokens_per_second": ("histogram", "LLM decode throughput per request."),
+    "feeding_ai_llm_tokens_total": ("counter", "Tokens generated by the LLM."),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense; thread-safe."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        with self._lock:
+            counts, total, n = list(self.counts), self.sum, self.count
+        cumulative, acc = [], 0
+        for le, c in zip(self.buckets + (float("inf"),), counts):
+            acc += c
+            cumulative.append((le, acc))
+        return cumulative, total, n
+
+
+_ENABLED = os.environ.get("FEEDING_AI_METRICS", "").strip().lower() in ("1", "true", "yes", "on")
+_HISTOGRAMS: Dict[Tuple[str, str], Histogram] = {}
+_COUNTERS: Dict[str, float] = {}
+_LOCK = threading.Lock()
+_RECORDER: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("feeding_ai_stage_recorder", default=None)
+_NULL = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    return _ENABLED
+
+
+def enable(on: bool = True) -> None:
+    """Turn collection on/off process-wide (default from FEEDING_AI_METRICS)."""
+    global _ENABLED
+    _ENABLED = bool(on)
+
+
+def _histogram(name: str, label: str, buckets: Sequence[float]) -> Histogram:
+    key = (name, label)
+    h = _HISTOGRAMS.get(key)
+    if h is None:
+        with _LOCK:
+            h = _HISTOGRAMS.setdefault(key, Histogram(buckets))
+    return h
+
+
+def observe(name: str, value: float, *, label: str = "", buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+    if _ENABLED:
+        _histogram(name, label, buckets).observe(value)
+
+
+def inc(name: str, value: float = 1.0) -> None:
+    if _ENABLED:
+        with _LOCK:
+            _COUNTERS[name] = _COUNTERS.get(name, 0.0) + value
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Record an already-measured stage (histogram + the active `collect()` breakdown, if any)."""
+    if not _ENABLED:
+        return
+    _histogram("feeding_ai_stage_seconds", name, LATENCY_BUCKETS).observe(seconds)
+    rec = _RECORDER.get()
+    if rec is not None:
+        rec.append((name, seconds))
+
+
+def observe_llm(new_tokens: int, decode_seconds: float, ttft_seconds: Optional[float] = None) -> None:
+    if not _ENABLED:
+        return
+    inc("feeding_ai_llm_tokens_total", new_tokens)
+    if decode_seconds > 0 and new_tokens > 0:
+        observe("feeding_ai_llm_tokens_per_second", new_tokens / decode_seconds, buckets=RATE_BUCKETS)
+    if ttft_seconds is not None:
+        observe("feeding_ai_llm_ttft_seconds", ttft_seconds)
+
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Stage":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        record_stage(self.name, time.perf_counter() - self.t0)
+
+
+def stage(name: str) -> contextlib.AbstractContextManager:
+    """`with stage("parse"): ...` times the block; a shared no-op when metrics are disabled."""
+    return _Stage(name) if _ENABLED else _NULL
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the (stage, seconds) pairs recorded in this context, in order (e.g. for `--profile`)."""
+    rec: List[Tuple[str, float]] = []
+    token = _RECORDER.set(rec)
+    try:
+        yield rec
+    finally:
+        _RECORDER.reset(token)
+
+
+def reset() -> None:
+    with _LOCK:
+        _HISTOGRAMS.clear()
+        _COUNTERS.clear()
+
+
+def _fmt(v: float) -> str:
+    return "+Inf" if v == float("inf") else repr(float(v))
+
+
+def render_prometheus() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    with _LOCK:
+        hists = sorted(_HISTOGRAMS.items())
+        counters = sorted(_COUNTERS.items())
+    lines: List[str] = []
+    seen = set()
+    for (name, label), h in hists:
+        if name not in seen:
+            seen.add(name)
+            kind, help_ = _HELP.get(name, ("histogram", name))
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {kind}")
+        buckets, total, n = h.snapshot()
+        base = f'stage="{label}",' if name == "feeding_ai_stage_seconds" else (f'label="{label}",' if label else "")
+        for le, c in buckets:
+            lines.append(f'{name}_bucket{{{base}le="{_fmt(le)}"}} {c}')
+        sel = f"{{{base.rstrip(',')}}}" if base else ""
+        lines.append(f"{name}_sum{sel} {total!r}")
+        lines.append(f"{name}_count{sel} {n}")
+    for name, value in counters:
+        kind, help_ = _HELP.get(name, ("counter", name))
+        lines.append(f"# HELP {name} {help_}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def format_breakdown(rows: Sequence[Tuple[str, float]]) -> str:
+    """Human-readable per-stage table for one call; repeated stages are summed."""
+    totals: Dict[str, float] = {}
+    for name, secs in rows:
+        totals[name] = totals.get(name, 0.0) + secs
+    grand = sum(totals.values()) or 1e-12
+    width = max([len(n) for n in totals] + [5])
+    out = [f"{'stage':<{width}}  {'ms':>10}  {'%':>6}"]
+    for name, secs in totals.items():
+        out.append(f"{name:<{width}}  {secs * 1e3:>10.3f}  {secs / grand * 100:>5.1f}%")
+    out.append(f"{'total':<{width}}  {grand * 1e3:>10.3f}")
+    return "\n".join(out)
@@ -37,19 +37,25 @@ class Meal:
     nutrients_focus: List[str]
 
 
+# Per-sport-type coefficients, shared with the vectorized cohort path.
+KCAL_PER_KG: Dict[str, float] = {"low": 30.0, "mixed": 33.0, "endurance": 35.0, "strength": 34.0}
+PROTEIN_PER_KG: Dict[str, float] = {"low": 1.6, "mixed": 1.8, "endurance": 1.6, "strength": 2.0}
+FAT_PER_KG: Dict[str, float] = {"low": 0.8, "mixed": 0.9, "endurance": 0.8, "strength": 0.9}
+
+
 def estimate_daily_targets(profile: Profile) -> DailyTargets:
     wt = float(profile.weight_kg)
     st = sport_type(profile.sport)
 
     # Simple energy estimate by sport intensity (kcal/kg)
-    kcal_per_kg = {"low": 30.0, "mixed": 33.0, "endurance": 35.0, "strength": 34.0}[st]
+    kcal_per_kg = KCAL_PER_KG[st]
     calories = int(round(wt * kcal_per_kg))
     calories = max(1600, min(4200, calories))
 
-    protein_per_kg = {"low": 1.6, "mixed": 1.8, "endurance": 1.6, "strength": 2.0}[st]
+    protein_per_kg = PROTEIN_PER_KG[st]
     protein_g = int(round(wt * protein_per_kg))
 
-    fat_per_kg = 0.9 if st in {"strength", "mixed"} else 0.8
+    fat_per_kg = FAT_PER_KG[st]
     fats_g = int(round(wt * fat_per_kg))
     fats_g = max(45, min(120, fats_g))
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 
 from .lang import Lang
 
@@ -17,14 +17,27 @@ class Profile:
 
 _ARABIC_INDIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
 _EXT_ARABIC_INDIC_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
+_ALL_DIGITS = {**_ARABIC_INDIC_DIGITS, **_EXT_ARABIC_INDIC_DIGITS}
+_INDIC_DIGIT_RE = re.compile("[٠-٩۰-۹]")
+
+_NUM = r"(\d+(?:\.\d+)?)"
+_FIRST_FLOAT_RE = re.compile(_NUM)
+_METERS_RE = re.compile(_NUM + r"\s*(m|meter|meters|metre|metres|م)\b")
+_CM_RE = re.compile(_NUM + r"\s*(cm|centimeter|centimeters|centimetre|centimetres|سم)\b")
+_HEIGHT_KW_RE = re.compile(r"(?:height|tall|طولي|الطول)\s*[:\-]?\s*" + _NUM)
+_POUNDS_RE = re.compile(_NUM + r"\s*(lb|lbs|pound|pounds)\b")
+_KG_RE = re.compile(_NUM + r"\s*(kg|كيلو|كجم|كيلوجرام|كيلوغرام)\b")
+_WEIGHT_KW_RE = re.compile(r"(?:weight|وزني|الوزن)\s*[:\-]?\s*" + _NUM)
 
 
 def _normalize_numbers(text: str) -> str:
-    return (text or "").translate(_ARABIC_INDIC_DIGITS).translate(_EXT_ARABIC_INDIC_DIGITS)
+    text = text or ""
+    # translate() walks every character; skip it for the common all-ASCII-digits case.
+    return text.translate(_ALL_DIGITS) if _INDIC_DIGIT_RE.search(text) else text
 
 
 def _first_float(text: str) -> Optional[float]:
-    m = re.search(r"(\d+(?:\.\d+)?)", text)
+    m = _FIRST_FLOAT_RE.search(text)
     if not m:
         return None
     try:
@@ -34,10 +47,12 @@ def _first_float(text: str) -> Optional[float]:
 
 
 def _parse_height_cm(text: str) -> Optional[float]:
-    t = _normalize_numbers(text).lower()
+    return _height_from_normalized(_normalize_numbers(text).lower())
 
+
+def _height_from_normalized(t: str) -> Optional[float]:
     # meters
-    m = re.search(r"(\d+(?:\.\d+)?)\s*(m|meter|meters|metre|metres|م)\b", t)
+    m = _METERS_RE.search(t)
     if m:
         val = float(m.group(1))
         # if someone writes 175 m by mistake, ignore meters rule
@@ -45,17 +60,14 @@ def _parse_height_cm(text: str) -> Optional[float]:
             return val * 100.0
 
     # centimeters
-    m = re.search(
-        r"(\d+(?:\.\d+)?)\s*(cm|centimeter|centimeters|centimetre|centimetres|سم)\b",
-        t,
-    )
+    m = _CM_RE.search(t) if ("cm" in t or "centim" in t or "سم" in t) else None
     if m:
         val = float(m.group(1))
         if 90 <= val <= 250:
             return val
 
     # Arabic phrasing: "طولي 175" (assume cm if plausible)
-    m = re.search(r"(?:height|tall|طولي|الطول)\s*[:\-]?\s*(\d+(?:\.\d+)?)", t)
+    m = _HEIGHT_KW_RE.search(t) if ("height" in t or "tall" in t or "طولي" in t or "الطول" in t) else None
     if m:
         val = float(m.group(1))
         if 90 <= val <= 250:
@@ -72,24 +84,26 @@ def _parse_height_cm(text: str) -> Optional[float]:
 
 
 def _parse_weight_kg(text: str) -> Optional[float]:
-    t = _normalize_numbers(text).lower()
+    return _weight_from_normalized(_normalize_numbers(text).lower())
+
 
+def _weight_from_normalized(t: str) -> Optional[float]:
     # pounds
-    m = re.search(r"(\d+(?:\.\d+)?)\s*(lb|lbs|pound|pounds)\b", t)
+    m = _POUNDS_RE.search(t) if ("lb" in t or "pound" in t) else None
     if m:
         val = float(m.group(1))
         if 50 <= val <= 600:
             return val * 0.45359237
 
     # kilograms
-    m = re.search(r"(\d+(?:\.\d+)?)\s*(kg|كيلو|كجم|كيلوجرام|كيلوغرام)\b", t)
+    m = _KG_RE.search(t) if ("kg" in t or "كيلو" in t or "كجم" in t) else None
     if m:
         val = float(m.group(1))
         if 25 <= val <= 300:
             return val
 
     # Arabic phrasing: "وزني 78"
-    m = re.search(r"(?:weight|وزني|الوزن)\s*[:\-]?\s*(\d+(?:\.\d+)?)", t)
+    m = _WEIGHT_KW_RE.search(t) if ("weight" in t or "وزني" in t or "الوزن" in t) else None
     if m:
         val = float(m.group(1))
         if 25 <= val <= 300:
@@ -115,21 +129,30 @@ _SPORT_SYNONYMS = {
 }
 
 
+# Longer synonyms first to reduce false positives; ties keep definition order.
+# Built once: C substring search per synonym beats a regex alternation scan on long messages.
+_SPORT_PAIRS: List[Tuple[str, str, str]] = [
+    (k, s, s.lower())
+    for k, s in sorted(
+        ((k, s) for k, syns in _SPORT_SYNONYMS.items() for s in syns),
+        key=lambda x: len(x[1]),
+        reverse=True,
+    )
+]
+_SPORT_FALLBACK_RE = re.compile(r"(?:sport|رياضة|الرياضة|بلعب|بمارس|أمارس)\s*[:\-]?\s*([^\n\r,\.]+)", flags=re.IGNORECASE)
+
+
 def _detect_sport(text: str) -> Tuple[Optional[str], Optional[str]]:
-    t = (text or "").lower()
-    # Check longer synonyms first to reduce false positives
-    pairs = []
-    for k, syns in _SPORT_SYNONYMS.items():
-        for s in syns:
-            pairs.append((k, s))
-    pairs.sort(key=lambda x: len(x[1]), reverse=True)
-
-    for key, syn in pairs:
-        if syn.lower() in t:
+    return _sport_from(text, (text or "").lower())
+
+
+def _sport_from(text: str, lowered: str) -> Tuple[Optional[str], Optional[str]]:
+    for key, syn, syn_lower in _SPORT_PAIRS:
+        if syn_lower in lowered:
             return key, syn
 
     # fallback: try to pick last word-ish after "sport"/"رياضة"
-    m = re.search(r"(?:sport|رياضة|الرياضة|بلعب|بمارس|أمارس)\s*[:\-]?\s*([^\n\r,\.]+)", text or "", flags=re.IGNORECASE)
+    m = _SPORT_FALLBACK_RE.search(text or "")
     if m:
         raw = m.group(1).strip()
         if raw:
@@ -138,10 +161,19 @@ def _detect_sport(text: str) -> Tuple[Optional[str], Optional[str]]:
     return None, None
 
 
+def extract_fields(text: str) -> Tuple[Optional[float], Optional[float], Optional[str], Optional[str]]:
+    """
+    (height_cm, weight_kg, sport_key, sport_raw) with a single normalization pass over `text`.
+    Synonyms contain no digits, so the digit-normalized text is also safe for sport matching,
+    and each unit regex only runs when its unit/keyword substring is present at all.
+    """
+    t = _normalize_numbers(text).lower()
+    sport_key, sport_raw = _sport_from(text, t)
+    return _height_from_normalized(t), _weight_from_normalized(t), sport_key, sport_raw
+
+
 def parse_profile(text: str, lang: Lang) -> Profile:
-    height_cm = _parse_height_cm(text)
-    weight_kg = _parse_weight_kg(text)
-    sport_key, sport_raw = _detect_sport(text)
+    height_cm, weight_kg, sport_key, sport_raw = extract_fields(text)
 
     missing = []
     if height_cm is None:
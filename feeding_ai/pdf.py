@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+FONT_NAME = "CustomArabic"
+FONT_PATH = Path(__file__).resolve().parent / "assets" / "fonts" / "Amiri-Regular.ttf"
+
+_FONT_LOCK = threading.Lock()
+_FONT_REGISTERED = False
+
+
+def _cache_size_from_env() -> int:
+    try:
+        return max(0, int(os.environ.get("FEEDING_AI_PDF_CACHE_SIZE", "128") or 0))
+    except ValueError:
+        return 128
+
+
+_PDF_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
+_PDF_CACHE_LOCK = threading.Lock()
+_PDF_CACHE_SIZE = _cache_size_from_env()
+
+
+def _register_font() -> None:
+    """Register the Amiri TTF once per process; TTFont parsing dominates small renders."""
+    global _FONT_REGISTERED
+    if _FONT_REGISTERED:
+        return
+    with _FONT_LOCK:
+        if _FONT_REGISTERED:
+            return
+        try:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+        except Exception as e:  # pragma: no cover
+            raise RuntimeError("reportlab is required for PDF export (pip install reportlab).") from e
+        pdfmetrics.registerFont(TTFont(FONT_NAME, str(FONT_PATH)))
+        _FONT_REGISTERED = True
+
+
+def content_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _build_pdf(text: str) -> bytes:
+    from xml.sax.saxutils import escape
+
+    from reportlab.lib.enums import TA_LEFT, TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    _register_font()
+    is_arabic = any("\u0600" <= c <= "\u06FF" for c in text)
+    style = ParagraphStyle(
+        name="CustomStyle",
+        fontName=FONT_NAME,
+        fontSize=12,
+        leading=18,
+        alignment=TA_RIGHT if is_arabic else TA_LEFT,
+    )
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    # Keep line structure; escape so plan text is never read as paragraph markup.
+    doc.build([Paragraph(escape(text).replace("\n", "<br/>"), style), Spacer(1, 0.5 * inch)])
+    return buffer.getvalue()
+
+
+def render_pdf(text: str) -> bytes:
+    """PDF bytes for a plan (markdown text), cached by content hash (FEEDING_AI_PDF_CACHE_SIZE, 0 disables)."""
+    if _PDF_CACHE_SIZE <= 0:
+        return _build_pdf(text)
+    key = content_key(text)
+    with _PDF_CACHE_LOCK:
+        out = _PDF_CACHE.get(key)
+        if out is not None:
+            _PDF_CACHE.move_to_end(key)
+            return out
+    out = _build_pdf(text)
+    with _PDF_CACHE_LOCK:
+        _PDF_CACHE[key] = out
+        while len(_PDF_CACHE) > _PDF_CACHE_SIZE:
+            _PDF_CACHE.popitem(last=False)
+    return out
+
+
+def render_many(texts: Sequence[str], *, workers: Optional[int] = None) -> List[bytes]:
+    """
+    Render several plans, in order. Identical texts are rendered once; with more than one
+    distinct text and workers != 1 the renders run in a process pool.
+    """
+    unique: Dict[str, str] = {}
+    for t in texts:
+        unique.setdefault(content_key(t), t)
+    keys = list(unique)
+    workers = min(workers or os.cpu_count() or 1, len(keys))
+    if workers <= 1:
+        rendered = [render_pdf(unique[k]) for k in keys]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = list(pool.map(render_pdf, [unique[k] for k in keys], chunksize=max(1, len(keys) // (workers * 4))))
+    by_key = dict(zip(keys, rendered))
+    return [by_key[content_key(t)] for t in texts]
+
+
+def build_zip(files: Iterable[Tuple[str, bytes]]) -> bytes:
+    """ZIP archive of (name, bytes) entries. PDFs are already compressed, so entries are stored."""
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in files:
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def export_zip(plans: Sequence[Tuple[str, str]], *, workers: Optional[int] = None) -> bytes:
+    """Bulk export: `(file stem, plan text)` pairs -> ZIP of `<stem>.pdf` files."""
+    pdfs = render_many([text for _, text in plans], workers=workers)
+    return build_zip((f"{name}.pdf", data) for (name, _), data in zip(plans, pdfs))
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .nutrition import DailyTargets, Meal, meal_templates, nutrient_examples
+from .parser import Profile
+from .workouts import WorkoutPlan, workout_plans_for_type
+
+_RECOVERY_NOTES = {
+    "ar": (
+        "نوم 7-9 ساعات.",
+        "بعد التمرين: وجبة فيها بروتين + كربوهيدرات خلال 1-3 ساعات.",
+        "لو هدفك تخسيس/زيادة وزن: قلّل/زوّد 200-300 kcal وراقب التغيير أسبوعيًا.",
+    ),
+    "en": (
+        "Sleep 7-9 hours.",
+        "Post-workout: protein + carbs within 1-3 hours.",
+        "For fat loss/gain: adjust +/-200-300 kcal and track weekly.",
+    ),
+}
+
+
+@lru_cache(maxsize=None)
+def static_content(lang: str, st: str) -> Tuple[Tuple[Meal, ...], Dict[str, List[str]], Tuple[WorkoutPlan, ...], Tuple[str, ...]]:
+    """Meals, food examples, workout plans and recovery notes for (lang, sport type); shared, treat as read-only."""
+    return (
+        tuple(meal_templates(lang)),
+        nutrient_examples(lang),
+        tuple(workout_plans_for_type(lang, st)),
+        _RECOVERY_NOTES["ar" if lang == "ar" else "en"],
+    )
+
+
+class Plan:
+    """
+    Structured nutrition + workout plan. Renderers run on demand; markdown is cached
+    and byte-identical to RuleBasedGenerator.generate().
+    """
+
+    __slots__ = (
+        "lang",
+        "profile",
+        "sport_name",
+        "sport_type",
+        "sport_type_label",
+        "bmi",
+        "targets",
+        "meals",
+        "nutrient_examples",
+        "workout_plans",
+        "notes",
+        "_markdown",
+    )
+
+    def __init__(
+        self,
+        *,
+        lang: str,
+        profile: Profile,
+        sport_name: str,
+        sport_type: str,
+        sport_type_label: str,
+        bmi: float,
+        targets: DailyTargets,
+        meals: Sequence[Meal],
+        nutrient_examples: Mapping[str, List[str]],
+        workout_plans: Sequence[WorkoutPlan],
+        notes: Sequence[str],
+    ) -> None:
+        self.lang = lang
+        self.profile = profile
+        self.sport_name = sport_name
+        self.sport_type = sport_type
+        self.sport_type_label = sport_type_label
+        self.bmi = bmi
+        self.targets = targets
+        self.meals = meals
+        self.nutrient_examples = nutrient_examples
+        self.workout_plans = workout_plans
+        self.notes = notes
+        self._markdown: Optional[str] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__ if k != "_markdown"}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for k, v in state.items():
+            setattr(self, k, v)
+        self._markdown = None
+
+    # ---- markdown ----
+
+    def markdown_sections(self) -> List[str]:
+        """Top-level `##`/`###` blocks; joined with newlines they give `to_markdown()`."""
+        return [
+            _title_section(self.lang),
+            _profile_section(self.lang, self.profile, self.sport_name, self.bmi),
+            _targets_section(self.lang, self.targets),
+            *self._static_sections(),
+        ]
+
+    def markdown_parts(self) -> Tuple[str, str]:
+        """(per-profile head, shared tail) with head + tail == to_markdown()."""
+        head = "\n".join(self.markdown_sections()[:3]) + "\n"
+        if self._has_shared_static():
+            return head, _cached_static_tail(self.lang, self.sport_type, self.sport_type_label)
+        return head, "\n".join(self._static_sections())
+
+    def to_markdown(self) -> str:
+        if self._markdown is None:
+            self._markdown = "\n".join(self.markdown_sections())
+        return self._markdown
+
+    def _has_shared_static(self) -> bool:
+        meals, ex, workouts, notes = static_content(self.lang, self.sport_type)
+        return self.meals is meals and self.nutrient_examples is ex and self.workout_plans is workouts and self.notes is notes
+
+    def _static_sections(self) -> Tuple[str, ...]:
+        # Plans built by RuleBasedGenerator share the per-(lang, sport type) content, so its text is rendered once.
+        if self._has_shared_static():
+            return _cached_static_sections(self.lang, self.sport_type, self.sport_type_label)
+        return _render_static_sections(
+            self.lang, self.sport_type_label, self.meals, self.nutrient_examples, self.workout_plans, self.notes
+        )
+
+    # ---- JSON ----
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lang": self.lang,
+            "profile": asdict(self.profile),
+            "sport_name": self.sport_name,
+            "sport_type": self.sport_type,
+            "sport_type_label": self.sport_type_label,
+            "bmi": round(self.bmi, 1),
+            "targets": asdict(self.targets),
+            "meals": [
+                {
+                    "name": m.name,
+                    "macro_split": list(m.macro_split),
+                    "components": list(m.components),
+                    "nutrients_focus": list(m.nutrients_focus),
+                }
+                for m in self.meals
+            ],
+            "nutrient_examples": {k: list(v) for k, v in self.nutrient_examples.items()},
+            "workout_plans": [{"title": w.title, "days": list(w.days), "notes": list(w.notes)} for w in self.workout_plans],
+            "notes": list(self.notes),
+        }
+
+    def to_json(self, **kwargs: Any) -> str:
+        import json
+
+        kwargs.setdefault("ensure_ascii", False)
+        return json.dumps(self.to_dict(), **kwargs)
+
+    # ---- HTML ----
+
+    def to_html(self) -> str:
+        import html
+
+        ar = self.lang == "ar"
+        e = html.escape
+        t = self.targets
+        h = _HEADINGS["ar" if ar else "en"]
+        out: List[str] = [f'<article class="feeding-plan" lang="{e(self.lang)}" dir="{"rtl" if ar else "ltr"}">']
+        out.append(f"<h2>{e(h['title'])}</h2>")
+        out.append(f"<h3>{e(h['profile'])}</h3><ul>")
+        out.append(f"<li><b>{e(h['height'])}</b>: {self.profile.height_cm:.0f} {e(h['cm'])}</li>")
+        out.append(f"<li><b>{e(h['weight'])}</b>: {self.profile.weight_kg:.1f} {e(h['kg'])}</li>")
+        out.append(f"<li><b>{e(h['sport'])}</b>: {e(self.sport_name)}</li>")
+        out.append(f"<li><b>BMI</b>: {self.bmi:.1f}</li></ul>")
+        out.append(f"<h3>{e(h['targets'])}</h3><ul>")
+        out.append(f"<li><b>{e(h['calories'])}</b>: {t.calories_kcal} kcal</li>")
+        out.append(f"<li><b>{e(h['protein'])}</b>: {t.protein_g} g</li>")
+        out.append(f"<li><b>{e(h['carbs'])}</b>: {t.carbs_g} g</li>")
+        out.append(f"<li><b>{e(h['fats'])}</b>: {t.fats_g} g</li>")
+        out.append(f"<li><b>{e(h['water'])}</b>: {t.water_liters:.1f} L</li></ul>")
+        out.append(f"<h3>{e(h['meals'])}</h3>")
+        for m in self.meals:
+            out.append(f"<h4>{e(m.name)}</h4><ul>")
+            out.extend(f"<li>{e(c)}</li>" for c in m.components)
+            out.append(f"<li><b>{e(h['focus'])}</b>: {e(', '.join(m.nutrients_focus))}</li></ul>")
+        out.append(f"<h3>{e(h['examples'])}</h3><ul>")
+        sep = "، " if ar else ", "  # as in the markdown renderer
+        out.extend(f"<li><b>{e(k)}</b>: {e(sep.join(v))}</li>" for k, v in self.nutrient_examples.items())
+        out.append("</ul>")
+        out.append(f"<h3>{e(h['workouts'])}</h3><p><b>{e(h['sport_type'])}</b>: {e(self.sport_type_label)}</p>")
+        for w in self.workout_plans:
+            out.append(f"<h4>{e(w.title)}</h4><ul>")
+            out.extend(f"<li>{e(d)}</li>" for d in w.days)
+            out.append("</ul>")
+            if w.notes:
+                out.append("<ul class=\"notes\">" + "".join(f"<li>{e(n)}</li>" for n in w.notes) + "</ul>")
+        out.append(f"<h3>{e(h['recovery'])}</h3><ul>")
+        out.extend(f"<li>{e(n)}</li>" for n in self.notes)
+        out.append("</ul></article>")
+        return "\n".join(out)
+
+
+_HEADINGS = {
+    "ar": {
+        "title": "خطة غذائية + تمارين (مولّدة تلقائيًا)",
+        "profile": "بياناتك",
+        "height": "الطول",
+        "weight": "الوزن",
+        "sport": "الرياضة",
+        "cm": "سم",
+        "kg": "كجم",
+        "targets": "أهداف يومية (تقديرية)",
+        "calories": "السعرات",
+        "protein": "بروتين",
+        "carbs": "كربوهيدرات",
+        "fats": "دهون",
+        "water": "مياه",
+        "meals": "3 وجبات (مكوّنات + عناصر غذائية + أمثلة)",
+        "focus": "تركيز عناصر",
+        "examples": "أمثلة منتجات/أطعمة حسب العنصر",
+        "workouts": "تمارين مقترحة (جيم + منزل)",
+        "sport_type": "نمط رياضي مستنتج",
+        "recovery": "ملاحظات سريعة للتعافي",
+    },
+    "en": {
+        "title": "Auto-generated Nutrition + Training Plan",
+        "profile": "Your profile",
+        "height": "Height",
+        "weight": "Weight",
+        "sport": "Sport",
+        "cm": "cm",
+        "kg": "kg",
+        "targets": "Daily targets (estimated)",
+        "calories": "Calories",
+        "protein": "Protein",
+        "carbs": "Carbs",
+        "fats": "Fats",
+        "water": "Water",
+        "meals": "3 meals (ingredients + nutrients + examples)",
+        "focus": "Nutrient focus",
+        "examples": "Food examples by nutrient",
+        "workouts": "Suggested workouts (Gym + Home)",
+        "sport_type": "Inferred sport type",
+        "recovery": "Quick recovery notes",
+    },
+}
+
+
+def _title_section(lang: str) -> str:
+    if lang == "ar":
+        return "## خطة غذائية + تمارين (مولّدة تلقائيًا)\n"
+    return "## Auto-generated Nutrition + Training Plan\n"
+
+
+def _profile_section(lang: str, profile: Profile, sport_name: str, bmi: float) -> str:
+    if lang == "ar":
+        lines = [
+            "### بياناتك",
+            f"- **الطول**: {profile.height_cm:.0f} سم",
+            f"- **الوزن**: {profile.weight_kg:.1f} كجم",
+            f"- **الرياضة**: {sport_name}",
+            f"- **BMI تقريبي**: {bmi:.1f}",
+            "",
+        ]
+    else:
+        lines = [
+            "### Your profile",
+            f"- **Height**: {profile.height_cm:.0f} cm",
+            f"- **Weight**: {profile.weight_kg:.1f} kg",
+            f"- **Sport**: {sport_name}",
+            f"- **Estimated BMI**: {bmi:.1f}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def _targets_section(lang: str, targets: DailyTargets) -> str:
+    if lang == "ar":
+        lines = [
+            "### أهداف يومية (تقديرية)",
+            f"- **السعرات**: {targets.calories_kcal} kcal/يوم",
+            f"- **بروتين**: {targets.protein_g} g",
+            f"- **كربوهيدرات**: {targets.carbs_g} g",
+            f"- **دهون**: {targets.fats_g} g",
+            f"- **مياه**: {targets.water_liters:.1f} لتر (زود مع التعرّق)",
+            "",
+        ]
+    else:
+        lines = [
+            "### Daily targets (estimated)",
+            f"- **Calories**: {targets.calories_kcal} kcal/day",
+            f"- **Protein**: {targets.protein_g} g",
+            f"- **Carbs**: {targets.carbs_g} g",
+            f"- **Fats**: {targets.fats_g} g",
+            f"- **Water**: {targets.water_liters:.1f} L (increase with sweating)",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=None)
+def _cached_static_sections(lang: str, st: str, st_label: str) -> Tuple[str, ...]:
+    """Meals, food examples, workouts and recovery notes depend only on (lang, sport type)."""
+    meals, ex, workouts, notes = static_content(lang, st)
+    return _render_static_sections(lang, st_label, meals, ex, workouts, notes)
+
+
+@lru_cache(maxsize=None)
+def _cached_static_tail(lang: str, st: str, st_label: str) -> str:
+    return "\n".join(_cached_static_sections(lang, st, st_label))
+
+
+def _render_static_sections(
+    lang: str,
+    st_label: str,
+    meals: Sequence[Meal],
+    ex: Mapping[str, List[str]],
+    workout_plans: Sequence[WorkoutPlan],
+    notes: Sequence[str],
+) -> Tuple[str, ...]:
+    ar = lang == "ar"
+
+    meal_lines: List[str] = ["### 3 وجبات (مكوّنات + عناصر غذائية + أمثلة)" if ar else "### 3 meals (ingredients + nutrients + examples)"]
+    for meal in meals:
+        meal_lines.append(f"#### {meal.name}")
+        for c in meal.components:
+            meal_lines.append(f"- {c}")
+        meal_lines.append(f"- **{'تركيز عناصر' if ar else 'Nutrient focus'}**: {', '.join(meal.nutrients_focus)}")
+        meal_lines.append("")
+
+    ex_lines: List[str] = ["### أمثلة منتجات/أطعمة حسب العنصر" if ar else "### Food examples by nutrient"]
+    for k, items in ex.items():
+        ex_lines.append(f"- **{k}**: " + ("، " if ar else ", ").join(items))
+    ex_lines.append("")
+
+    wp_lines: List[str] = ["### تمارين مقترحة (جيم + منزل)" if ar else "### Suggested workouts (Gym + Home)"]
+    wp_lines.append(f"- **{'نمط رياضي مستنتج' if ar else 'Inferred sport type'}**: {st_label}")
+    for wp in workout_plans:
+        wp_lines.append(f"#### {wp.title}")
+        for d in wp.days:
+            wp_lines.append(f"- {d}")
+        if wp.notes:
+            wp_lines.append("- **ملاحظات**:" if ar else "- **Notes**:")
+            for n in wp.notes:
+                wp_lines.append(f"  - {n}")
+        wp_lines.append("")
+
+    recovery = ["### ملاحظات سريعة للتعافي" if ar else "### Quick recovery notes"]
+    recovery.extend(f"- {n}" for n in notes)
+
+    return tuple("\n".join(sec) for sec in (meal_lines, ex_lines, wp_lines, recovery))
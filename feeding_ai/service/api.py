@@ -1,12 +1,65 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import re
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Iterator, List, Literal
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 
-from ..core import generate_from_text
+from .. import metrics
+from ..core import generate_from_text, stream_from_text
+from ..generators.cpu import CPU_MODE_PATTERN
+from .jobs import Job, get_job_queue, shutdown_job_queue
+from .preload import get_preloader
+from .workers import generate_chunk, profile_dict, render_plan, run_in_pool, shutdown_pools
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Loading runs in the background: `/` answers at once, `/ready` once the models are warm.
+    get_preloader().start()
+    # Resumes jobs left queued/running in FEEDING_AI_JOBS_DB without waiting for a /jobs request.
+    get_job_queue()
+    yield
+    from ..generators.output_cache import get_output_cache
+
+    shutdown_job_queue()
+    shutdown_pools()
+    cache = get_output_cache()
+    if cache is not None:
+        cache.flush()
+
 
+# The service collects stage timings unless FEEDING_AI_METRICS is explicitly off.
+metrics.enable(os.environ.get("FEEDING_AI_METRICS", "1").strip().lower() not in ("0", "false", "no", "off"))
 
-app = FastAPI(title="Feeding AI", version="0.1.0")
+app = FastAPI(title="Feeding AI", version="0.1.0", lifespan=_lifespan)
+
+# Texts per worker task for /generate/batch (amortizes process-pool IPC).
+BATCH_CHUNK_SIZE = 64
+# PDFs per worker task for /export.zip; each render is far costlier than the IPC, so keep chunks small.
+PDF_CHUNK_SIZE = 4
+
+# LLM options shared by the request models below.
+LLMMode = Annotated[
+    str | None,
+    Field(
+        pattern=CPU_MODE_PATTERN,
+        description="CPU inference mode for the LLM: fp32, bf16 or int8, optionally +compile (default FEEDING_AI_LLM_MODE).",
+    ),
+]
+LLMSeed = Annotated[
+    int | None,
+    Field(
+        ge=0,
+        description="LLM sampling seed (same seed, same plan); unseeded requests share one cached plan per profile.",
+    ),
+]
 
 
 class GenerateRequest(BaseModel):
@@ -15,30 +68,317 @@ class GenerateRequest(BaseModel):
         default=None,
         description="Optional HuggingFace model name/path for stronger generation (requires transformers/torch).",
     )
+    llm_mode: LLMMode = None
+    seed: LLMSeed = None
+    format: Literal["markdown", "json", "html"] = Field(
+        default="markdown",
+        description="`json` returns the structured plan in `structured`; `html` returns rendered HTML in `plan`. Rule-based only.",
+    )
 
 
 class GenerateResponse(BaseModel):
     lang: str
     profile: dict
-    plan: str
+    plan: str | None = None
+    structured: dict | None = None
+
+
+class BatchGenerateRequest(BaseModel):
+    texts: List[str] = Field(..., description="User messages; each is processed independently.")
+    llm_base_model: str | None = Field(
+        default=None,
+        description="Optional HuggingFace model name/path used for every item.",
+    )
+    llm_mode: LLMMode = None
+    seed: LLMSeed = None
+
+
+class ExportRequest(BaseModel):
+    texts: List[str] = Field(..., description="User messages, e.g. one per athlete on a team roster.")
+    names: List[str] | None = Field(
+        default=None,
+        description="Optional file names (without extension), same length as `texts`.",
+    )
+    llm_base_model: str | None = Field(
+        default=None,
+        description="Optional HuggingFace model name/path used for every item.",
+    )
+    llm_mode: LLMMode = None
+    seed: LLMSeed = None
+
+
+class BatchItem(BaseModel):
+    index: int
+    ok: bool
+    lang: str | None = None
+    profile: dict | None = None
+    plan: str | None = None
+    error: str | None = None
+
+
+class BatchGenerateResponse(BaseModel):
+    results: List[BatchItem]
+
+
+class JobRequest(BaseModel):
+    text: str = Field(..., description="User input containing height, weight, and sport.")
+    llm_base_model: str | None = Field(
+        default=None,
+        description="HuggingFace model name/path; the LLM plan is generated in the background.",
+    )
+    llm_mode: LLMMode = None
+    seed: LLMSeed = None
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "done", "error"]
+    lang: str | None = None
+    profile: dict | None = None
+    placeholder: str | None = Field(default=None, description="Rule-based plan, available immediately.")
+    plan: str | None = Field(default=None, description="Final plan once `status` is `done`.")
+    error: str | None = None
+    created: float
+    started: float | None = None
+    finished: float | None = None
+
+
+# Upper bound for GET /jobs/{id}?wait=...; keeps long-polls under common proxy timeouts.
+MAX_JOB_WAIT_S = 60.0
 
 
 @app.get("/")
 def root() -> dict:
+    """Liveness: the process is up (models may still be loading)."""
     return {"ok": True, "service": "Feeding AI"}
 
 
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """Readiness: 200 once every FEEDING_AI_PRELOAD model is loaded and warmed up, 503 until then."""
+    status = get_preloader().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics() -> PlainTextResponse:
+    """Per-stage latency histograms and LLM token/TTFT metrics in Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/llm/stats")
+def llm_stats() -> dict:
+    from ..generators.batching import scheduler_stats
+    from ..generators.output_cache import get_output_cache
+    from ..generators.pool import get_pool
+    from ..generators.prefix_cache import prefix_cache_stats
+
+    cache = get_output_cache()
+    return {
+        "pool": get_pool().stats(),
+        "schedulers": scheduler_stats(),
+        "output_cache": cache.stats() if cache is not None else None,
+        "prefix_cache": prefix_cache_stats(),
+        "jobs": get_job_queue().stats(),
+        "preload": get_preloader().status(),
+    }
+
+
 @app.post("/generate", response_model=GenerateResponse)
-def generate(req: GenerateRequest) -> GenerateResponse:
-    res = generate_from_text(req.text, llm_base_model=req.llm_base_model)
+async def generate(req: GenerateRequest) -> GenerateResponse:
+    if req.format != "markdown" and req.llm_base_model:
+        raise HTTPException(status_code=400, detail=f"format={req.format!r} is only available for rule-based plans")
+    try:
+        if req.format != "markdown":
+            return GenerateResponse(**await run_in_pool("rule", render_plan, req.text, req.format))
+        if req.llm_base_model:
+            # LLM requests share batched decode steps with other in-flight requests.
+            res = await run_in_pool(
+                "llm",
+                generate_from_text,
+                req.text,
+                llm_base_model=req.llm_base_model,
+                batched=True,
+                llm_mode=req.llm_mode,
+                seed=req.seed,
+            )
+        else:
+            res = await run_in_pool("rule", generate_from_text, req.text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return GenerateResponse(
         lang=res.lang.code,
-        profile={
-            "height_cm": res.profile.height_cm,
-            "weight_kg": res.profile.weight_kg,
-            "sport": res.profile.sport,
-            "sport_raw": res.profile.sport_raw,
-        },
+        profile=profile_dict(res.profile),
         plan=res.text,
     )
 
+
+async def _generate_items(
+    texts: List[str], llm_base_model: str | None, llm_mode: str | None = None, seed: int | None = None
+) -> List[dict]:
+    if llm_base_model:
+        # One task per item so the batching scheduler sees them all in flight together.
+        chunks = [[t] for t in texts]
+        pool = "llm"
+    else:
+        chunks = [texts[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(texts), BATCH_CHUNK_SIZE)]
+        pool = "cpu"
+    parts = await asyncio.gather(*(run_in_pool(pool, generate_chunk, c, llm_base_model, llm_mode, seed) for c in chunks))
+    return [item for part in parts for item in part]
+
+
+def _job_response(job: Job) -> JobResponse:
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        lang=job.lang,
+        profile=job.profile,
+        placeholder=job.placeholder,
+        plan=job.plan,
+        error=job.error,
+        created=job.created,
+        started=job.started,
+        finished=job.finished,
+    )
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(req: JobRequest) -> JobResponse:
+    """
+    Returns at once with the rule-based plan as `placeholder`; the LLM plan is produced by the
+    in-process job queue. Poll `GET /jobs/{job_id}` (optionally with `?wait=`) for the result.
+    """
+    try:
+        res = await run_in_pool("rule", generate_from_text, req.text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    profile = profile_dict(res.profile)
+    if req.llm_base_model:
+        job = get_job_queue().submit(
+            req.text,
+            req.llm_base_model,
+            llm_mode=req.llm_mode,
+            seed=req.seed,
+            lang=res.lang.code,
+            profile=profile,
+            placeholder=res.text,
+        )
+    else:
+        # Nothing to wait for: the rule-based plan is the final plan.
+        job = get_job_queue().complete(req.text, lang=res.lang.code, profile=profile, plan=res.text)
+    return _job_response(job)
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, wait: float = 0.0) -> JobResponse:
+    """`wait` (seconds, up to MAX_JOB_WAIT_S) long-polls until the job is done or errored."""
+    job = await get_job_queue().wait(job_id, min(max(wait, 0.0), MAX_JOB_WAIT_S))
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job id")
+    return _job_response(job)
+
+
+@app.post("/generate/batch", response_model=BatchGenerateResponse)
+async def generate_batch(req: BatchGenerateRequest) -> BatchGenerateResponse:
+    """Per-item results in input order; a bad item yields an error record, not a failed request."""
+    items = await _generate_items(req.texts, req.llm_base_model, req.llm_mode, req.seed)
+    return BatchGenerateResponse(results=[BatchItem(index=i, **item) for i, item in enumerate(items)])
+
+
+@app.post("/generate.pdf")
+async def generate_pdf(req: GenerateRequest) -> Response:
+    """The markdown plan rendered to PDF (cached per worker by plan content)."""
+    from ..pdf import render_pdf
+
+    try:
+        if req.llm_base_model:
+            res = await run_in_pool(
+                "llm",
+                generate_from_text,
+                req.text,
+                llm_base_model=req.llm_base_model,
+                batched=True,
+                llm_mode=req.llm_mode,
+                seed=req.seed,
+            )
+        else:
+            res = await run_in_pool("rule", generate_from_text, req.text)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data = await run_in_pool("cpu", render_pdf, res.text)
+    return Response(
+        content=data,
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="feeding_ai_plan.pdf"'},
+    )
+
+
+_UNSAFE_NAME_RE = re.compile(r"[^\w.-]+")
+
+
+def _export_name(names: List[str] | None, i: int) -> str:
+    name = _UNSAFE_NAME_RE.sub("_", names[i]).strip("._") if names else ""
+    return name or f"plan-{i + 1:03d}"
+
+
+@app.post("/export.zip")
+async def export_pdf_zip(req: ExportRequest) -> Response:
+    """
+    Bulk PDF export: plans are generated and rendered across the `cpu` worker pool and returned
+    as one ZIP. Items that fail are listed in `errors.txt` instead of failing the export.
+    """
+    from ..pdf import build_zip, render_many
+
+    if req.names is not None and len(req.names) != len(req.texts):
+        raise HTTPException(status_code=400, detail="names must have the same length as texts")
+    items = await _generate_items(req.texts, req.llm_base_model, req.llm_mode, req.seed)
+    ok = [i for i, item in enumerate(items) if item["ok"]]
+    plans = [items[i]["plan"] for i in ok]
+    chunks = [plans[j:j + PDF_CHUNK_SIZE] for j in range(0, len(plans), PDF_CHUNK_SIZE)]
+    parts = await asyncio.gather(*(run_in_pool("cpu", render_many, c, workers=1) for c in chunks))
+    pdfs = [pdf for part in parts for pdf in part]
+
+    files = []
+    used: set = set()
+    for i, pdf in zip(ok, pdfs):
+        name = _export_name(req.names, i)
+        filename, n = f"{name}.pdf", 1
+        # A suffixed name may itself be taken (names "a", "a", "a-2"), so probe until free.
+        while filename in used:
+            n += 1
+            filename = f"{name}-{n}.pdf"
+        used.add(filename)
+        files.append((filename, pdf))
+    errors = [f"{i}: {item['error']}" for i, item in enumerate(items) if not item["ok"]]
+    if errors:
+        files.append(("errors.txt", ("\n".join(errors) + "\n").encode("utf-8")))
+    return Response(
+        content=build_zip(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="feeding_ai_plans.zip"'},
+    )
+
+
+def _sse(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/generate/stream")
+def generate_stream(req: GenerateRequest) -> StreamingResponse:
+    """Server-sent events: one `meta` event, `chunk` events as text is produced, then `done`."""
+    try:
+        res = stream_from_text(req.text, llm_base_model=req.llm_base_model, llm_mode=req.llm_mode, seed=req.seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def _events() -> Iterator[str]:
+        yield _sse("meta", {"lang": res.lang.code, "profile": profile_dict(res.profile)})
+        try:
+            for chunk in res.chunks:
+                yield _sse("chunk", chunk)
+        except Exception as e:
+            yield _sse("error", str(e))
+            return
+        yield _sse("done", {})
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
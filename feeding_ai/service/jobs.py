@@ -0,0 +1,425 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..core import generate_from_text
+
+_FINAL = ("done", "error")
+
+
+@dataclass
+class Job:
+    id: str
+    text: str
+    llm_base_model: Optional[str]
+    llm_mode: Optional[str] = None
+    seed: Optional[int] = None
+    status: str = "queued"  # queued | running | done | error
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    lang: Optional[str] = None
+    profile: Optional[Dict[str, Any]] = None
+    placeholder: Optional[str] = None
+    plan: Optional[str] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _owner_gone(owner: str) -> bool:
+    """True if `owner` (host:pid:token) is a process on this host that no longer exists."""
+    host, _, rest = owner.partition(":")
+    pid = rest.split(":", 1)[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass
+    return False
+
+
+class _Store:
+    """
+    Optional SQLite persistence, shareable by several processes. Every unfinished job is owned by
+    one process (`owner`), which keeps extending its `lease`; another process takes a job over
+    only once its owner has exited or the lease has run out.
+    """
+
+    def __init__(self, path: str, owner: str, lease_seconds: float) -> None:
+        self.owner = owner
+        self.lease_seconds = float(lease_seconds)
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._closed = False
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, updated REAL NOT NULL, "
+                "owner TEXT NOT NULL, lease REAL NOT NULL, data TEXT NOT NULL)"
+            )
+
+    def save(self, job: Job) -> None:
+        # Only the owner may update a job, so a process whose job was taken over cannot overwrite it.
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                return
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, updated, owner, lease, data) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, updated = excluded.updated, "
+                "lease = excluded.lease, data = excluded.data WHERE jobs.owner = excluded.owner",
+                (
+                    job.id,
+                    job.status,
+                    now,
+                    self.owner,
+                    now + self.lease_seconds,
+                    json.dumps(job.to_dict(), ensure_ascii=False),
+                ),
+            )
+
+    def renew(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._conn.execute(
+                "UPDATE jobs SET lease = ? WHERE owner = ? AND status NOT IN ('done', 'error')",
+                (time.time() + self.lease_seconds, self.owner),
+            )
+
+    def orphans(self) -> List[Tuple[Job, str, float]]:
+        """Unfinished jobs of other processes whose owner has exited or whose lease has expired."""
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                return []
+            rows = self._conn.execute(
+                "SELECT data, owner, lease FROM jobs "
+                "WHERE status NOT IN ('done', 'error') AND owner != ? ORDER BY updated",
+                (self.owner,),
+            ).fetchall()
+        return [
+            (Job(**json.loads(data)), owner, lease)
+            for data, owner, lease in rows
+            if lease < now or _owner_gone(owner)
+        ]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            if self._closed:
+                return None
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(**json.loads(row[0])) if row is not None else None
+
+    def claim(self, job: Job, owner: str, lease: float) -> bool:
+        """Take `job` over from `owner`; compare-and-set on (owner, lease), so one process wins."""
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                return False
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, updated = ?, owner = ?, lease = ?, data = ? "
+                "WHERE id = ? AND owner = ? AND lease = ?",
+                (
+                    job.status,
+                    now,
+                    self.owner,
+                    now + self.lease_seconds,
+                    json.dumps(job.to_dict(), ensure_ascii=False),
+                    job.id,
+                    owner,
+                    lease,
+                ),
+            )
+        return cur.rowcount == 1
+
+    def delete_before(self, cutoff: float) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error') AND updated < ?", (cutoff,)
+            )
+
+    def close(self) -> None:
+        # Worker threads may still be generating; their later saves become no-ops.
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+
+
+class JobQueue:
+    """
+    In-process queue for LLM plans. Worker threads call `generate_from_text(..., batched=True)`,
+    so concurrent jobs share decode steps in the batching scheduler. Finished jobs are kept
+    for `ttl_seconds`. With `db_path` the jobs survive restarts and can be shared by several
+    processes: each runs the jobs it owns and adopts those of an exited or stalled process
+    (no lease renewal for `lease_seconds`).
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 4,
+        ttl_seconds: float = 3600.0,
+        db_path: Optional[str] = None,
+        lease_seconds: float = 30.0,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.ttl_seconds = float(ttl_seconds)
+        self.lease_seconds = max(1.0, float(lease_seconds))
+        self._jobs: Dict[str, Job] = {}
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+        self._threads: List[threading.Thread] = []
+        self._stopping = threading.Event()
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._store = _Store(db_path, owner, self.lease_seconds) if db_path else None
+        self._adopt()
+
+    def _adopt(self) -> int:
+        """Queue the orphaned jobs this process wins; returns how many."""
+        if self._store is None:
+            return 0
+        adopted = 0
+        for job, owner, lease in self._store.orphans():
+            job.status, job.started = "queued", None
+            if not self._store.claim(job, owner, lease):
+                continue  # another process took it first
+            with self._lock:
+                self._jobs[job.id] = job
+            self._queue.put(job.id)
+            adopted += 1
+        return adopted
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"feeding-job-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+            if self._store is not None:
+                t = threading.Thread(target=self._keep_leases, name="feeding-job-lease", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _keep_leases(self) -> None:
+        while not self._stopping.wait(self.lease_seconds / 3):
+            self._store.renew()  # type: ignore[union-attr]
+            self._adopt()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for t in threads:
+            t.join(timeout=1.0)
+        if self._store is not None:
+            # Jobs still generating keep their rows (saves are no-ops from here on); once this
+            # process is gone another one adopts them.
+            self._store.close()
+
+    def submit(
+        self,
+        text: str,
+        llm_base_model: str,
+        *,
+        llm_mode: Optional[str] = None,
+        seed: Optional[int] = None,
+        lang: Optional[str] = None,
+        profile: Optional[Dict[str, Any]] = None,
+        placeholder: Optional[str] = None,
+    ) -> Job:
+        job = Job(
+            id=uuid.uuid4().hex,
+            text=text,
+            llm_base_model=llm_base_model,
+            llm_mode=llm_mode,
+            seed=seed,
+            lang=lang,
+            profile=profile,
+            placeholder=placeholder,
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        self.start()
+        self._queue.put(job.id)
+        return job
+
+    def complete(self, text: str, *, lang: str, profile: Dict[str, Any], plan: str) -> Job:
+        """Record an already finished job (rule-based requests), so clients poll one API either way."""
+        now = time.time()
+        job = Job(
+            id=uuid.uuid4().hex,
+            text=text,
+            llm_base_model=None,
+            status="done",
+            created=now,
+            started=now,
+            finished=now,
+            lang=lang,
+            profile=profile,
+            placeholder=plan,
+            plan=plan,
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        self._expire()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self._store is not None:
+            # Created by another worker process sharing the database.
+            job = self._store.get(job_id)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Long-poll: return once the job is finished or `timeout` seconds have passed."""
+        job = self.get(job_id)
+        if job is None or job.status in _FINAL or timeout <= 0:
+            return job
+        with self._lock:
+            local = job_id in self._jobs
+        if not local:
+            return await self._poll_store(job_id, timeout)
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        with self._lock:
+            if job.status in _FINAL:
+                return job
+            self._waiters.setdefault(job_id, []).append((loop, fut))
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(job_id, [])
+                if (loop, fut) in waiters:
+                    waiters.remove((loop, fut))
+                if not waiters:
+                    self._waiters.pop(job_id, None)
+        return self.get(job_id)
+
+    async def _poll_store(self, job_id: str, timeout: float, interval: float = 0.25) -> Optional[Job]:
+        # Jobs run by another process: no in-process notification, so poll the shared database.
+        deadline = time.monotonic() + timeout
+        job = self.get(job_id)
+        while job is not None and job.status not in _FINAL and time.monotonic() < deadline:
+            await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+            job = self.get(job_id)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": self.workers, "pending": self._queue.qsize(), "jobs": counts, "persistent": self._store is not None}
+
+    def _save(self, job: Job) -> None:
+        if self._store is not None:
+            self._store.save(job)
+
+    def _work(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            job = self.get(job_id)
+            if job is None or job.status in _FINAL:
+                continue
+            job.status, job.started = "running", time.time()
+            self._save(job)
+            try:
+                res = generate_from_text(
+                    job.text, llm_base_model=job.llm_base_model, batched=True, llm_mode=job.llm_mode, seed=job.seed
+                )
+                job.plan = res.text
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "error"
+            job.finished = time.time()
+            self._save(job)
+            self._notify(job_id)
+            self._expire()
+
+    def _notify(self, job_id: str) -> None:
+        with self._lock:
+            waiters = self._waiters.pop(job_id, [])
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.status in _FINAL and (j.finished or 0) < cutoff]:
+                del self._jobs[job_id]
+        if self._store is not None:
+            self._store.delete_before(cutoff)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, "") or default)
+    except ValueError:
+        return default
+
+
+_QUEUE: Optional[JobQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Shared queue: FEEDING_AI_JOB_WORKERS (default 4), FEEDING_AI_JOB_TTL_S (default 3600),
+    FEEDING_AI_JOBS_DB (SQLite path for persistence; unset = in memory only) and
+    FEEDING_AI_JOB_LEASE_S (default 30; unfinished jobs of a process silent that long are adopted).
+    """
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = JobQueue(
+                workers=int(_env_float("FEEDING_AI_JOB_WORKERS", 4)),
+                ttl_seconds=_env_float("FEEDING_AI_JOB_TTL_S", 3600.0),
+                db_path=os.environ.get("FEEDING_AI_JOBS_DB", "").strip() or None,
+                lease_seconds=_env_float("FEEDING_AI_JOB_LEASE_S", 30.0),
+            )
+            # Adopted jobs need workers before anyone submits; a shared database needs lease renewal.
+            stats = _QUEUE.stats()
+            if stats["pending"] or stats["persistent"]:
+                _QUEUE.start()
+        return _QUEUE
+
+
+def shutdown_job_queue() -> None:
+    global _QUEUE
+    with _QUEUE_LOCK:
+        q, _QUEUE = _QUEUE, None
+    if q is not None:
+        q.stop()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..lang import Lang
+from ..parser import Profile
+
+# One short generation per language through the batching scheduler, the path every API LLM
+# route takes: loads the weights, starts the scheduler thread and runs the first (slow) steps.
+_WARMUP_PROFILE = Profile(height_cm=178.0, weight_kg=75.0, sport="football", sport_raw="football")
+_WARMUP_LANGS = (Lang("en"), Lang("ar"))
+
+
+@dataclasses.dataclass
+class _Target:
+    spec: str
+    status: str = "pending"  # pending | loading | warming | ready | error
+    load_seconds: Optional[float] = None
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Preloader:
+    """
+    Loads the configured models (`MODEL` or `MODEL@ADAPTER`, in the default LLM mode) into the
+    shared model pool on a background thread and warms them up. `ready()` is true once every
+    target is loaded and warm; a target that fails to load keeps the service not ready.
+    """
+
+    def __init__(self, specs: List[str], *, warmup_tokens: int = 8) -> None:
+        self.warmup_tokens = max(0, int(warmup_tokens))
+        self._targets = [_Target(spec) for spec in specs]
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None or not self._targets:
+                return
+            self._thread = threading.Thread(target=self._run, name="feeding-preload", daemon=True)
+            self._thread.start()
+
+    def _set(self, target: _Target, **changes: Any) -> None:
+        with self._lock:
+            for name, value in changes.items():
+                setattr(target, name, value)
+
+    def _run(self) -> None:
+        from ..generators.llm import LLMGenerator
+        from ..generators.pool import get_pool
+
+        for target in self._targets:
+            try:
+                gen = LLMGenerator.from_spec(target.spec)
+                self._set(target, status="loading")
+                t0 = time.perf_counter()
+                get_pool().get(gen.model_key)
+                self._set(target, status="warming", load_seconds=round(time.perf_counter() - t0, 3))
+                t0 = time.perf_counter()
+                if self.warmup_tokens:
+                    warm = dataclasses.replace(gen, max_new_tokens=self.warmup_tokens)
+                    for fut in [warm.submit(_WARMUP_PROFILE, lang) for lang in _WARMUP_LANGS]:
+                        fut.result()
+                self._set(target, status="ready", warmup_seconds=round(time.perf_counter() - t0, 3))
+            except Exception as e:
+                self._set(target, status="error", error=f"{type(e).__name__}: {e}")
+
+    def ready(self) -> bool:
+        with self._lock:
+            return all(t.status == "ready" for t in self._targets)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": all(t.status == "ready" for t in self._targets),
+                "models": [dataclasses.asdict(t) for t in self._targets],
+            }
+
+
+_PRELOADER: Optional[Preloader] = None
+_PRELOADER_LOCK = threading.Lock()
+
+
+def get_preloader() -> Preloader:
+    """
+    From FEEDING_AI_PRELOAD (comma-separated `MODEL[@ADAPTER]`; unset = nothing to preload) and
+    FEEDING_AI_WARMUP_TOKENS (new tokens per warm-up generation, default 8; 0 = load only).
+    """
+    global _PRELOADER
+    with _PRELOADER_LOCK:
+        if _PRELOADER is None:
+            specs = [s.strip() for s in os.environ.get("FEEDING_AI_PRELOAD", "").split(",") if s.strip()]
+            try:
+                tokens = int(os.environ.get("FEEDING_AI_WARMUP_TOKENS", "") or 8)
+            except ValueError:
+                tokens = 8
+            _PRELOADER = Preloader(specs, warmup_tokens=tokens)
+        return _PRELOADER
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _preload_in_master(specs: List[str]) -> None:
+    """
+    Load models into the shared pool before forking. Torch runs single-threaded here: a parent
+    that has started an OpenMP thread team can deadlock its forked children on their first parallel op.
+    """
+    from ..generators.cpu import set_threads
+    from ..generators.llm import LLMGenerator
+    from ..generators.pool import get_pool
+
+    set_threads(1)
+    for spec in specs:
+        t0 = time.perf_counter()
+        get_pool().get(LLMGenerator.from_spec(spec).model_key)
+        print(f"[serve] loaded {spec} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+def _run_worker(sock: socket.socket, app_path: str, threads: int, log_level: str) -> None:
+    import random
+
+    import uvicorn
+
+    # Frozen objects stay out of collection; only objects created from here on are tracked.
+    gc.enable()
+    random.seed()
+    if "torch" in sys.modules:
+        import torch
+
+        torch.seed()  # workers must not share one sampling stream
+        from ..generators.cpu import set_threads
+
+        set_threads(threads)
+    config = uvicorn.Config(app_path, lifespan="on", log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Pre-fork server: models listed in --preload (FEEDING_AI_PRELOAD) are loaded once in the master,
+    then `--workers` processes are forked onto one listening socket. Weight pages are shared
+    copy-on-write; `gc.freeze()` before the fork keeps the collector from writing to (and so copying)
+    the pages of every object the master created. Workers still warm up through the app lifespan,
+    so `/ready` behaves as with a plain uvicorn run. Dead workers are restarted; with FEEDING_AI_JOBS_DB
+    each worker leases the jobs it runs, so a restarted worker takes over only the jobs of workers that
+    have exited or whose lease (FEEDING_AI_JOB_LEASE_S) ran out, never those of its live siblings.
+    """
+    ap = argparse.ArgumentParser(description="Run the Feeding AI API with models shared across forked workers.")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=int(os.environ.get("FEEDING_AI_SERVE_WORKERS", "") or 2))
+    ap.add_argument(
+        "--preload",
+        default=None,
+        help="Comma-separated MODEL[@ADAPTER] to load before forking (default FEEDING_AI_PRELOAD).",
+    )
+    ap.add_argument("--llm-mode", default=None, help="Default LLM mode, e.g. int8 (sets FEEDING_AI_LLM_MODE).")
+    ap.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="torch intra-op threads per worker (default: CPU count / workers).",
+    )
+    ap.add_argument("--cpu-workers", type=int, default=None, help="Rule-based pool size per worker (FEEDING_AI_CPU_WORKERS).")
+    ap.add_argument("--llm-workers", type=int, default=None, help="LLM thread pool size per worker (FEEDING_AI_LLM_WORKERS).")
+    ap.add_argument("--model-pool-mb", type=float, default=None, help="Model pool budget per process (FEEDING_AI_MODEL_POOL_MB).")
+    ap.add_argument("--job-lease-s", type=float, default=None, help="Job lease before another worker may resume it (FEEDING_AI_JOB_LEASE_S).")
+    ap.add_argument(
+        "--no-share",
+        action="store_true",
+        help="Load models in each worker instead of the master (baseline for memory comparisons).",
+    )
+    ap.add_argument("--app", default="feeding_ai.service.api:app")
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args(argv)
+
+    env = {
+        "FEEDING_AI_PRELOAD": args.preload,
+        "FEEDING_AI_LLM_MODE": args.llm_mode,
+        "FEEDING_AI_CPU_WORKERS": args.cpu_workers,
+        "FEEDING_AI_LLM_WORKERS": args.llm_workers,
+        "FEEDING_AI_MODEL_POOL_MB": args.model_pool_mb,
+        "FEEDING_AI_JOB_LEASE_S": args.job_lease_s,
+    }
+    for name, value in env.items():
+        if value is not None:
+            os.environ[name] = str(value)
+    # Rust tokenizers refuse to use their thread pool after a fork; make that explicit up front.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    workers = max(1, int(args.workers))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    specs = [s.strip() for s in os.environ.get("FEEDING_AI_PRELOAD", "").split(",") if s.strip()]
+    if workers > 1 and not os.environ.get("FEEDING_AI_JOBS_DB"):
+        print("[serve] note: without FEEDING_AI_JOBS_DB, /jobs/{id} is only known to the worker that created it", file=sys.stderr)
+
+    sock = _bind(args.host, args.port)
+    # Nothing the master allocates from here on is ever freed; don't let the collector touch it.
+    gc.disable()
+    if specs and not args.no_share:
+        _preload_in_master(specs)
+    # Import the app (and everything it pulls in) once, in the master, so workers share those pages too.
+    __import__(args.app.split(":", 1)[0])
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def _spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_worker(sock, args.app, threads, args.log_level)
+            except BaseException:
+                import traceback
+
+                traceback.print_exc()
+                code = 1
+            os._exit(code)
+        children[pid] = slot
+
+    def _stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    for slot in range(workers):
+        _spawn(slot)
+    print(
+        f"[serve] master {os.getpid()} on {args.host}:{args.port}: {workers} workers x {threads} threads, "
+        f"models {'per worker' if args.no_share else 'shared'}: {', '.join(specs) or '-'}",
+        file=sys.stderr,
+    )
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        slot = children.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"[serve] worker {pid} exited ({os.waitstatus_to_exitcode(status)}); restarting", file=sys.stderr)
+            time.sleep(1.0)
+            _spawn(slot)
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
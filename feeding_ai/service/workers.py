@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .. import metrics
+from ..core import ManyResult, generate_many, plan_from_text
+from ..parser import Profile
+
+T = TypeVar("T")
+
+_POOLS: Dict[str, Executor] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, "") or default))
+    except ValueError:
+        return default
+
+
+def _make_pool(name: str) -> Executor:
+    if name == "cpu":
+        # Chunks of rule-based plans (batches, PDF renders) are pure Python, so processes sidestep the GIL by default.
+        workers = _env_int("FEEDING_AI_CPU_WORKERS", os.cpu_count() or 1)
+        if os.environ.get("FEEDING_AI_CPU_POOL", "process").strip().lower() == "thread":
+            return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feeding-cpu")
+        return ProcessPoolExecutor(max_workers=workers)
+    if name == "rule":
+        # A single rule-based plan is ~20 µs of work; pickling and IPC to a process would cost ten times that.
+        workers = _env_int("FEEDING_AI_CPU_WORKERS", os.cpu_count() or 1)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="feeding-rule")
+    # LLM calls block on the shared batching scheduler; threads are enough and keep models in-process.
+    return ThreadPoolExecutor(max_workers=_env_int("FEEDING_AI_LLM_WORKERS", 32), thread_name_prefix="feeding-llm")
+
+
+def get_pool(name: str) -> Executor:
+    """
+    `cpu` for chunked work (FEEDING_AI_CPU_POOL=process|thread, FEEDING_AI_CPU_WORKERS), `rule` for
+    single rule-based plans (threads, FEEDING_AI_CPU_WORKERS) or `llm` (FEEDING_AI_LLM_WORKERS).
+    """
+    with _POOLS_LOCK:
+        pool = _POOLS.get(name)
+        if pool is None:
+            pool = _POOLS[name] = _make_pool(name)
+        return pool
+
+
+def shutdown_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _call_collecting(fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any]) -> Tuple[T, List[Tuple[str, float]]]:
+    # Runs in a worker process: its histograms are not ours, so ship the stage timings back.
+    metrics.enable()
+    with metrics.collect() as rows:
+        result = fn(*args, **kwargs)
+    return result, rows
+
+
+async def run_in_pool(name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    pool = get_pool(name)
+    if metrics.enabled() and isinstance(pool, ProcessPoolExecutor):
+        result, rows = await loop.run_in_executor(pool, _call_collecting, fn, args, kwargs)
+        for stage, seconds in rows:
+            metrics.record_stage(stage, seconds)
+        return result
+    return await loop.run_in_executor(pool, functools.partial(fn, *args, **kwargs))
+
+
+def profile_dict(profile: Profile) -> Dict[str, Any]:
+    return {
+        "height_cm": profile.height_cm,
+        "weight_kg": profile.weight_kg,
+        "sport": profile.sport,
+        "sport_raw": profile.sport_raw,
+    }
+
+
+def generate_chunk(
+    texts: List[str], llm_base_model: Optional[str] = None, llm_mode: Optional[str] = None, seed: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Generate plans for several texts; failures become per-item error records instead of raising."""
+    items = generate_many(texts, llm_base_model=llm_base_model, llm_mode=llm_mode, seed=seed)
+    return [item_dict(item) for item in items]
+
+
+def item_dict(item: ManyResult) -> Dict[str, Any]:
+    if item.result is None:
+        return {"ok": False, "error": item.error}
+    return {
+        "ok": True,
+        "lang": item.result.lang.code,
+        "profile": profile_dict(item.result.profile),
+        "plan": item.result.text,
+    }
+
+
+def render_plan(text: str, fmt: str) -> Dict[str, Any]:
+    """Rule-based plan rendered as `markdown`/`html` (in `plan`) or `json` (in `structured`)."""
+    res = plan_from_text(text)
+    out: Dict[str, Any] = {"lang": res.lang.code, "profile": profile_dict(res.profile)}
+    if fmt == "json":
+        out["structured"] = res.plan.to_dict()
+    elif fmt == "html":
+        out["plan"] = res.plan.to_html()
+    else:
+        out["plan"] = res.plan.to_markdown()
+    return out
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import sys
 from pathlib import Path
-from io import BytesIO
 
 import streamlit as st
 
@@ -107,47 +106,15 @@ if st.button("توليد الخطة" if is_ar else "Generate Plan"):
 # ================== PDF DOWNLOAD ==================
 if "generated_plan" in st.session_state:
 
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import ParagraphStyle
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import inch
-    from reportlab.pdfbase.ttfonts import TTFont
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.lib.enums import TA_RIGHT, TA_LEFT
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    # -------- FONT PATH --------
-    font_path = ROOT / "feeding_ai" / "assets" / "fonts" / "Amiri-Regular.ttf"
-    pdfmetrics.registerFont(TTFont("CustomArabic", str(font_path)))
-
-    generated_text = st.session_state["generated_plan"]
-
-    # كشف عربي تلقائي
-    is_arabic_output = any("\u0600" <= c <= "\u06FF" for c in generated_text)
-    alignment = TA_RIGHT if is_arabic_output else TA_LEFT
-
-    style = ParagraphStyle(
-        name="CustomStyle",
-        fontName="CustomArabic",
-        fontSize=12,
-        leading=18,
-        alignment=alignment,
-    )
-
-    # نحافظ على تنسيق الأسطر
-    formatted_text = generated_text.replace("\n", "<br/>")
-
-    elements.append(Paragraph(formatted_text, style))
-    elements.append(Spacer(1, 0.5 * inch))
+    # Fonts are registered once per process and PDFs are cached by plan content,
+    # so Streamlit reruns do not rebuild the document.
+    from feeding_ai.pdf import render_pdf
 
-    doc.build(elements)
+    pdf_bytes = render_pdf(st.session_state["generated_plan"])
 
     st.download_button(
         label="تحميل كـ PDF" if is_ar else "Download as PDF",
-        data=buffer.getvalue(),
+        data=pdf_bytes,
         file_name="feeding_ai_plan.pdf",
         mime="application/pdf"
     )
@@ -14,7 +14,10 @@ class WorkoutPlan:
 
 
 def build_workout_plans(lang: str, sport_key: str) -> List[WorkoutPlan]:
-    st = sport_type(sport_key)
+    return workout_plans_for_type(lang, sport_type(sport_key))
+
+
+def workout_plans_for_type(lang: str, st: str) -> List[WorkoutPlan]:
     if lang == "ar":
         return _arabic_plans(st)
     return _english_plans(st)
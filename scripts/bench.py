@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+if str(ROOT / "scripts") not in sys.path:
+    sys.path.insert(0, str(ROOT / "scripts"))
+
+from feeding_ai.core import generate_from_text
+from feeding_ai.generators.rule_based import RuleBasedGenerator, set_output_cache_size
+from feeding_ai.lang import Lang, _detect_cached, detect_lang
+from feeding_ai.nutrition import estimate_daily_targets
+from feeding_ai.parser import Profile, parse_profile
+
+# One representative sport per sport type.
+SPORT_BY_TYPE = {"low": "yoga", "mixed": "football", "endurance": "running", "strength": "gym_strength"}
+
+SPORT_WORDS = {
+    "ar": ["كرة قدم", "السباحة", "الجري", "الجيم", "يوغا", "ملاكمة"],
+    "en": ["football", "swimming", "running", "gym", "yoga", "boxing"],
+}
+
+Result = Dict[str, Any]
+
+
+def make_messages(n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        h, w = rng.randint(150, 200), rng.randint(45, 120)
+        if i % 2 == 0:
+            out.append(f"طولي {h} سم ووزني {w} كجم وبمارس {rng.choice(SPORT_WORDS['ar'])}")
+        else:
+            out.append(f"I am {h} cm, {w} kg, I play {rng.choice(SPORT_WORDS['en'])}. Need a meal plan.")
+    return out
+
+
+def _best_of(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _rate(ops: int, seconds: float, unit: str = "ops/s") -> Result:
+    return {"value": ops / seconds, "unit": unit, "higher_is_better": True, "per_op_us": seconds / ops * 1e6}
+
+
+def bench_detect_lang(msgs: Sequence[str], repeat: int) -> Dict[str, Result]:
+    run = lambda: [detect_lang(m) for m in msgs]  # noqa: E731
+    cold = _best_of(run, repeat, setup=_detect_cached.cache_clear)
+    warm = _best_of(run, repeat)
+    return {"detect_lang.uncached": _rate(len(msgs), cold), "detect_lang.cached": _rate(len(msgs), warm)}
+
+
+def bench_parse_profile(msgs: Sequence[str], repeat: int) -> Dict[str, Result]:
+    pairs = [(m, detect_lang(m)) for m in msgs]
+    return {"parse_profile": _rate(len(pairs), _best_of(lambda: [parse_profile(m, l) for m, l in pairs], repeat))}
+
+
+def bench_targets(n: int, seed: int, repeat: int) -> Dict[str, Result]:
+    rng = random.Random(seed)
+    sports = list(SPORT_BY_TYPE.values())
+    profiles = [Profile(rng.uniform(150, 200), rng.uniform(45, 120), rng.choice(sports), "") for _ in range(n)]
+    return {"estimate_daily_targets": _rate(n, _best_of(lambda: [estimate_daily_targets(p) for p in profiles], repeat))}
+
+
+def bench_rule_based(n: int, seed: int, repeat: int) -> Dict[str, Result]:
+    rng = random.Random(seed)
+    gen = RuleBasedGenerator()
+    out: Dict[str, Result] = {}
+    for code in ("ar", "en"):
+        lang = Lang(code)
+        for st, sport in SPORT_BY_TYPE.items():
+            profiles = [Profile(float(rng.randint(150, 200)), float(rng.randint(45, 120)), sport, sport) for _ in range(n)]
+            secs = _best_of(lambda: [gen.generate(p, lang) for p in profiles], repeat)
+            out[f"rule_based.generate.{code}.{st}"] = _rate(n, secs)
+    return out
+
+
+def bench_end_to_end(msgs: Sequence[str], repeat: int) -> Dict[str, Result]:
+    secs = _best_of(lambda: [generate_from_text(m) for m in msgs], repeat, setup=_detect_cached.cache_clear)
+    return {"generate_from_text": _rate(len(msgs), secs)}
+
+
+def bench_dataset(n: int, repeat: int) -> Dict[str, Result]:
+    from generate_dataset import iter_shard
+
+    secs = _best_of(lambda: sum(1 for _ in iter_shard(42, 0, 0, n)), repeat)
+    return {"dataset.samples": _rate(n, secs, "samples/s")}
+
+
+def bench_llm(model: str, max_new_tokens: int, n: int) -> Dict[str, Result]:
+    from feeding_ai.generators.llm import LLMGenerator
+    from feeding_ai.generators.pool import get_pool
+
+    gen = LLMGenerator(base_model=model, max_new_tokens=max_new_tokens, dtype="float32", device="cpu")
+    t0 = time.perf_counter()
+    tokenizer, _ = get_pool().get(gen.model_key)
+    load = time.perf_counter() - t0
+
+    profiles = [(Profile(170.0 + i, 70.0 + i, "running", "running"), Lang("en" if i % 2 else "ar")) for i in range(n)]
+    gen.generate(*profiles[0])  # warm-up
+    tokens = 0
+    t0 = time.perf_counter()
+    for p, lang in profiles:
+        tokens += len(tokenizer(gen.generate(p, lang), add_special_tokens=False)["input_ids"])
+    secs = time.perf_counter() - t0
+    return {
+        "llm.load_s": {"value": load, "unit": "s", "higher_is_better": False},
+        "llm.generate": _rate(max(1, tokens), secs, "tokens/s"),
+    }
+
+
+def bench_import_time(repeat: int) -> Dict[str, Result]:
+    """Cold-start import cost per entry point, with the slowest modules (`python -X importtime`)."""
+    from check_import_time import measure
+
+    out: Dict[str, Result] = {}
+    for module in ("feeding_ai.core", "feeding_ai.cli", "feeding_ai.service.api"):
+        res = measure(module, repeat)
+        out[f"import.{module}"] = {
+            "value": res["ms"],
+            "unit": "ms",
+            "higher_is_better": False,
+            "slowest": res["slowest"],
+            "heavy": res["heavy"],
+        }
+    return out
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: Dict[str, Result], baseline: Dict[str, Result], tolerance: float) -> List[str]:
+    """Names (with details) of benchmarks that are worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("value"):
+            continue
+        ratio = res["value"] / base["value"]
+        worse = ratio < 1 - tolerance if res.get("higher_is_better", True) else ratio > 1 + tolerance
+        if worse:
+            regressions.append(f"{name}: {res['value']:,.1f} vs baseline {base['value']:,.1f} {res['unit']} ({ratio:.2f}x)")
+    return regressions
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Offline micro-benchmarks for the hot paths (no GPU needed).")
+    ap.add_argument("--n", type=int, default=2000, help="Items per benchmark.")
+    ap.add_argument("--repeat", type=int, default=3, help="Rounds per benchmark; the best is reported.")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--only", default=None, help="Regex; run only benchmarks whose name matches.")
+    ap.add_argument("--llm", dest="llm_model", default=None, help="Local model path for the LLM benchmark (skipped if unset).")
+    ap.add_argument("--llm_tokens", type=int, default=32, help="max_new_tokens for the LLM benchmark.")
+    ap.add_argument("--llm_n", type=int, default=4, help="Generations for the LLM benchmark.")
+    ap.add_argument("--out", default=None, help="Write results as JSON to this path.")
+    ap.add_argument("--baseline", default=None, help="Results JSON to compare against; exit 1 on regression.")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown vs the baseline.")
+    args = ap.parse_args()
+
+    # Measure rendering itself, not the optional output LRU.
+    set_output_cache_size(0)
+    msgs = make_messages(args.n, args.seed)
+    suites: List[tuple] = [
+        ("detect_lang", lambda: bench_detect_lang(msgs, args.repeat)),
+        ("parse_profile", lambda: bench_parse_profile(msgs, args.repeat)),
+        ("estimate_daily_targets", lambda: bench_targets(args.n, args.seed, args.repeat)),
+        ("rule_based", lambda: bench_rule_based(max(1, args.n // 4), args.seed, args.repeat)),
+        ("generate_from_text", lambda: bench_end_to_end(msgs, args.repeat)),
+        ("dataset", lambda: bench_dataset(args.n, args.repeat)),
+        ("import_time", lambda: bench_import_time(max(3, args.repeat))),
+    ]
+    if args.llm_model:
+        suites.append(("llm", lambda: bench_llm(args.llm_model, args.llm_tokens, args.llm_n)))
+
+    only = re.compile(args.only) if args.only else None
+    results: Dict[str, Result] = {}
+    for name, run in suites:
+        if only and not only.search(name):
+            continue
+        for key, res in run().items():
+            results[key] = res
+            extra = f"  ({res['per_op_us']:.1f} us/op)" if "per_op_us" in res else ""
+            print(f"{key:<36} {res['value']:>14,.1f} {res['unit']}{extra}")
+            for mod, ms in res.get("slowest", [])[:5]:
+                print(f"    {ms:8.2f} ms  {mod}")
+            if res.get("heavy"):
+                print(f"    eagerly imports: {', '.join(res['heavy'])}")
+
+    report = {
+        "meta": {
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "n": args.n,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.out}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS (tolerance {args.tolerance:.0%}):", file=sys.stderr)
+            for r in regressions:
+                print(f"  {r}", file=sys.stderr)
+            return 1
+        print(f"No regressions vs {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+
+from feeding_ai.cohort import ProfileBatch, estimate_daily_targets_batch
+from feeding_ai.nutrition import estimate_daily_targets
+from feeding_ai.parser import Profile
+
+SPORTS = ["football", "basketball", "swimming", "running", "cycling", "tennis", "volleyball",
+          "martial_arts", "gym_strength", "crossfit", "yoga", "fitness", "handball"]
+
+
+def make_batch(n: int, seed: int) -> ProfileBatch:
+    rng = np.random.default_rng(seed)
+    height = rng.uniform(140, 210, n).round(1)
+    # Mix of integer, one-decimal and arbitrary weights, plus the clamp boundaries.
+    weight = np.concatenate([
+        rng.integers(25, 300, n // 3).astype(float),
+        rng.uniform(25, 300, n // 3).round(1),
+        rng.uniform(25, 300, n - 2 * (n // 3)),
+    ])
+    weight[: min(n, 8)] = [25.0, 45.0, 57.14, 70.0, 100.0, 120.0, 142.86, 300.0][: min(n, 8)]
+    sports = rng.choice(SPORTS, n)
+    return ProfileBatch.from_columns(height, weight, sports)
+
+
+def check_equivalence(batch: ProfileBatch, limit: int) -> int:
+    res = estimate_daily_targets_batch(batch)
+    bad = 0
+    for i in range(min(limit, len(batch))):
+        p = Profile(float(batch.height_cm[i]), float(batch.weight_kg[i]), batch.sport_keys[batch.sport[i]], "")
+        t = estimate_daily_targets(p)
+        row = (int(res.calories_kcal[i]), int(res.protein_g[i]), int(res.carbs_g[i]), int(res.fats_g[i]), float(res.water_liters[i]))
+        if row != (t.calories_kcal, t.protein_g, t.carbs_g, t.fats_g, t.water_liters):
+            bad += 1
+    return bad
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Scalar vs vectorized daily targets throughput.")
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--check", type=int, default=200_000, help="Rows compared against the scalar function.")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    batch = make_batch(args.n, args.seed)
+    bad = check_equivalence(batch, args.check)
+    if bad:
+        print(f"ERROR: {bad} rows differ from estimate_daily_targets", file=sys.stderr)
+        return 1
+
+    profiles = [
+        Profile(float(h), float(w), batch.sport_keys[s], "")
+        for h, w, s in zip(batch.height_cm, batch.weight_kg, batch.sport)
+    ]
+    t0 = time.perf_counter()
+    for p in profiles:
+        estimate_daily_targets(p)
+    scalar = time.perf_counter() - t0
+
+    vector = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        estimate_daily_targets_batch(batch)
+        vector = min(vector, time.perf_counter() - t0)
+
+    print(f"rows: {len(batch):,}  (equivalence checked on {min(args.check, len(batch)):,})")
+    print(f"scalar:     {len(batch) / scalar:14,.0f} rows/s  ({scalar:.3f} s)")
+    print(f"vectorized: {len(batch) / vector:14,.0f} rows/s  ({vector:.3f} s, {scalar / vector:.0f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
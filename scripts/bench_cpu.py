@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+PROMPT = "<|system|>\nYou are a nutrition + workout coach for athletes.\n<|user|>\nHeight: 180 cm\nWeight: 80.0 kg\nSport: football\n<|assistant|>\n"
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_one(model: str, mode: str, threads: int, max_new_tokens: int, n: int) -> Dict[str, Any]:
+    """One configuration in this process: load time, greedy decode tokens/s (after a warm-up) and peak RSS."""
+    import torch
+
+    from feeding_ai.generators.cpu import parse_mode, set_threads
+    from feeding_ai.generators.pool import ModelKey, _model_size_bytes, get_pool
+
+    if threads:
+        set_threads(threads)
+    opts = parse_mode(mode)
+    key = ModelKey(base_model=model, dtype=opts["dtype"], device="cpu", quantize=opts["quantize"], compile=opts["compile"])
+    t0 = time.perf_counter()
+    tokenizer, lm = get_pool().get(key)
+    load_s = time.perf_counter() - t0
+    rss_loaded = _peak_rss_mb()
+
+    inputs = tokenizer(PROMPT, return_tensors="pt")
+    # Exactly max_new_tokens per call so configurations are comparable.
+    kwargs = dict(max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens, do_sample=False)
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        lm.generate(**inputs, **kwargs)  # warm-up (includes compilation with +compile)
+    warmup_s = time.perf_counter() - t0
+
+    tokens = 0
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(n):
+            out = lm.generate(**inputs, **kwargs)
+            tokens += int(out.shape[-1] - inputs["input_ids"].shape[-1])
+    secs = time.perf_counter() - t0
+    return {
+        "mode": mode,
+        "threads": threads or torch.get_num_threads(),
+        "load_s": round(load_s, 3),
+        "warmup_s": round(warmup_s, 3),
+        "tokens_per_s": round(tokens / secs, 2) if secs > 0 else 0.0,
+        "model_mb": round(_model_size_bytes(lm) / (1024 * 1024), 2),
+        "rss_after_load_mb": round(rss_loaded, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="CPU inference benchmark: tokens/s and peak RSS per LLM mode and thread count.")
+    ap.add_argument("--model", required=True, help="Local HuggingFace model path (a small one is enough).")
+    ap.add_argument("--modes", default="fp32,bf16,int8", help="Comma-separated modes, e.g. fp32,int8,int8+compile.")
+    ap.add_argument("--threads", default="0", help="Comma-separated intra-op thread counts (0 = torch default).")
+    ap.add_argument("--tokens", type=int, default=64, help="New tokens per generation.")
+    ap.add_argument("--n", type=int, default=3, help="Timed generations per configuration.")
+    ap.add_argument("--out", default=None, help="Write results as JSON to this path.")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        # Each configuration runs in a fresh interpreter so peak RSS is its own.
+        mode, threads = args.child.rsplit(":", 1)
+        print(json.dumps(run_one(args.model, mode, int(threads), args.tokens, args.n)))
+        return 0
+
+    rows: List[Dict[str, Any]] = []
+    print(f"{'mode':<14} {'threads':>7} {'load s':>8} {'warmup s':>9} {'tokens/s':>10} {'model MB':>9} {'peak RSS MB':>12}")
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        for threads in [int(t) for t in args.threads.split(",") if t.strip()]:
+            cmd = [
+                sys.executable, __file__, "--model", args.model, "--tokens", str(args.tokens),
+                "--n", str(args.n), "--child", f"{mode}:{threads}",
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True, env=dict(os.environ, TOKENIZERS_PARALLELISM="false"))
+            if proc.returncode != 0:
+                err = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+                print(f"{mode:<14} {threads or '-':>7}  FAILED: {err}")
+                rows.append({"mode": mode, "threads": threads, "error": err})
+                continue
+            row = json.loads(proc.stdout.strip().splitlines()[-1])
+            rows.append(row)
+            print(
+                f"{row['mode']:<14} {row['threads']:>7} {row['load_s']:>8.2f} {row['warmup_s']:>9.2f} "
+                f"{row['tokens_per_s']:>10.1f} {row['model_mb']:>9.1f} {row['peak_rss_mb']:>12.1f}"
+            )
+
+    if args.out:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "model": args.model,
+                "tokens": args.tokens,
+                "n": args.n,
+            },
+            "results": rows,
+        }
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Wrote {args.out}")
+    return 1 if any("error" in r for r in rows) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from feeding_ai import lang as L
+
+_ARABIC_RE = re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]")
+
+
+def legacy_detect(text: str) -> str:
+    """Previous behaviour: Arabic regex, otherwise langdetect on every message."""
+    if _ARABIC_RE.search(text or ""):
+        return "ar"
+    detect = L._langdetect()
+    if detect is None:
+        return "en"
+    try:
+        return "ar" if str(detect(text)).startswith("ar") else "en"
+    except Exception:
+        return "en"
+
+
+def make_messages(n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        h, w = rng.randint(150, 200), rng.randint(45, 120)
+        if i % 2 == 0:
+            out.append(f"طولي {h} سم ووزني {w} كجم وبمارس كرة قدم")
+        else:
+            out.append(f"I am {h} cm, {w} kg, I play basketball. Need a meal plan and workouts.")
+    return out
+
+
+def _per_call_us(fn: Callable[[str], object], msgs: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in msgs:
+            fn(m)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(msgs) * 1e6
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Per-call latency of detect_lang vs the langdetect-per-message path.")
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    msgs = make_messages(args.n, args.seed)
+
+    t0 = time.perf_counter()
+    has_langdetect = L._langdetect() is not None
+    print(f"langdetect import: {(time.perf_counter() - t0) * 1000:.1f} ms ({'available' if has_langdetect else 'not installed'})")
+
+    mismatches = sum(1 for m in msgs if legacy_detect(m) != L.detect_lang(m).code)
+    if mismatches:
+        print(f"ERROR: {mismatches} messages differ from the previous detector", file=sys.stderr)
+        return 1
+
+    before = _per_call_us(legacy_detect, msgs, args.repeat)
+    L._detect_cached.cache_clear()
+    uncached = _per_call_us(lambda m: L._detect_cached.__wrapped__(m), msgs, args.repeat)
+    cached = _per_call_us(L.detect_lang, msgs, args.repeat)
+    print(f"before (regex + langdetect):  {before:8.2f} us/call")
+    print(f"after  (script fast path):    {uncached:8.2f} us/call")
+    print(f"after  (LRU hit):             {cached:8.2f} us/call")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from feeding_ai import parser as P
+
+
+# ---- previous implementation (per-call pair sort, per-field normalization), kept for comparison ----
+
+def _legacy_normalize(text: str) -> str:
+    return (text or "").translate(P._ARABIC_INDIC_DIGITS).translate(P._EXT_ARABIC_INDIC_DIGITS)
+
+
+def _legacy_height(text: str) -> Optional[float]:
+    t = _legacy_normalize(text).lower()
+    m = re.search(r"(\d+(?:\.\d+)?)\s*(m|meter|meters|metre|metres|م)\b", t)
+    if m and 1.0 <= float(m.group(1)) <= 2.5:
+        return float(m.group(1)) * 100.0
+    m = re.search(r"(\d+(?:\.\d+)?)\s*(cm|centimeter|centimeters|centimetre|centimetres|سم)\b", t)
+    if m and 90 <= float(m.group(1)) <= 250:
+        return float(m.group(1))
+    m = re.search(r"(?:height|tall|طولي|الطول)\s*[:\-]?\s*(\d+(?:\.\d+)?)", t)
+    if m:
+        val = float(m.group(1))
+        if 90 <= val <= 250:
+            return val
+        if 1.0 <= val <= 2.5:
+            return val * 100.0
+    m = re.search(r"(\d+(?:\.\d+)?)", t)
+    if m and 90 <= float(m.group(1)) <= 250:
+        return float(m.group(1))
+    return None
+
+
+def _legacy_weight(text: str) -> Optional[float]:
+    t = _legacy_normalize(text).lower()
+    m = re.search(r"(\d+(?:\.\d+)?)\s*(lb|lbs|pound|pounds)\b", t)
+    if m and 50 <= float(m.group(1)) <= 600:
+        return float(m.group(1)) * 0.45359237
+    m = re.search(r"(\d+(?:\.\d+)?)\s*(kg|كيلو|كجم|كيلوجرام|كيلوغرام)\b", t)
+    if m and 25 <= float(m.group(1)) <= 300:
+        return float(m.group(1))
+    m = re.search(r"(?:weight|وزني|الوزن)\s*[:\-]?\s*(\d+(?:\.\d+)?)", t)
+    if m and 25 <= float(m.group(1)) <= 300:
+        return float(m.group(1))
+    return None
+
+
+def _legacy_sport(text: str) -> Tuple[Optional[str], Optional[str]]:
+    t = (text or "").lower()
+    pairs = []
+    for k, syns in P._SPORT_SYNONYMS.items():
+        for s in syns:
+            pairs.append((k, s))
+    pairs.sort(key=lambda x: len(x[1]), reverse=True)
+    for key, syn in pairs:
+        if syn.lower() in t:
+            return key, syn
+    m = re.search(r"(?:sport|رياضة|الرياضة|بلعب|بمارس|أمارس)\s*[:\-]?\s*([^\n\r,\.]+)", text or "", flags=re.IGNORECASE)
+    if m and m.group(1).strip():
+        raw = m.group(1).strip()
+        return raw.lower().replace(" ", "_"), raw
+    return None, None
+
+
+def legacy_extract(text: str) -> tuple:
+    return (_legacy_height(text), _legacy_weight(text)) + _legacy_sport(text)
+
+
+# ---- workload ----
+
+_FILLER_EN = "Hi coach, I have been training a lot lately and want to improve my diet and recovery. "
+_FILLER_AR = "مرحبا يا كوتش، بقالي فترة بتمرن كتير وعايز أحسن أكلي والتعافي بعد التمرين. "
+
+
+def make_messages(n: int, filler_repeats: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    sports_en = ["basketball", "swimming", "boxing", "yoga", "crossfit", "tennis", "chess"]
+    sports_ar = ["كرة قدم", "سباحة", "ملاكمة", "جيم", "يوغا", "شطرنج"]
+    out = []
+    for i in range(n):
+        h, w = rng.randint(150, 200), rng.randint(45, 120)
+        if i % 2 == 0:
+            core = f"طولي {h} سم ووزني {w} كجم وبمارس {rng.choice(sports_ar)}. "
+            out.append(_FILLER_AR * filler_repeats + core + _FILLER_AR * filler_repeats)
+        else:
+            core = f"I am {h} cm, {w} kg, I play {rng.choice(sports_en)}. "
+            out.append(_FILLER_EN * filler_repeats + core + _FILLER_EN * filler_repeats)
+    return out
+
+
+def _rate(fn: Callable[[str], object], msgs: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in msgs:
+            fn(m)
+        best = min(best, time.perf_counter() - t0)
+    return len(msgs) / best
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Messages/sec for profile field extraction, before vs after.")
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--filler", type=int, default=10, help="Filler sentences on each side of the profile (message length).")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    msgs = make_messages(args.n, args.filler, args.seed)
+    mismatches = sum(1 for m in msgs if legacy_extract(m) != P.extract_fields(m))
+    if mismatches:
+        print(f"ERROR: {mismatches} messages differ between legacy and compiled extraction", file=sys.stderr)
+        return 1
+
+    avg_len = sum(len(m) for m in msgs) / len(msgs)
+    before = _rate(legacy_extract, msgs, args.repeat)
+    after = _rate(P.extract_fields, msgs, args.repeat)
+    print(f"messages: {len(msgs)}  avg chars: {avg_len:.0f}")
+    print(f"before: {before:,.0f} msg/s")
+    print(f"after:  {after:,.0f} msg/s  ({after / before:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
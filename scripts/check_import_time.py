@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Cold-start budgets (ms) for a fresh interpreter; measured as the cumulative
+# `python -X importtime` of everything the import pulls in from the package.
+DEFAULT_BUDGETS_MS: Dict[str, float] = {
+    "feeding_ai.core": 60.0,
+    "feeding_ai.cli": 80.0,
+}
+
+# Heavy optional dependencies that must only be imported on first use.
+HEAVY_MODULES = ("langdetect", "torch", "transformers", "peft", "reportlab", "fastapi", "numpy", "pyarrow", "datasets")
+ALLOWED_HEAVY: Dict[str, Tuple[str, ...]] = {"feeding_ai.service.api": ("fastapi",)}
+
+
+def _importtime(module: str) -> Tuple[List[Tuple[int, int, str, int]], List[str]]:
+    """Run `python -X importtime -c "import <module>"`; returns (self_us, cumulative_us, name, depth) rows and heavy modules loaded."""
+    code = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        # One space after the bar, then two per nesting level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(self_us), int(cum_us), name.strip(), depth))
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return rows, heavy
+
+
+def measure(module: str, repeat: int = 5) -> Dict[str, object]:
+    """
+    Best-of-`repeat` import cost of `module` in fresh interpreters: total ms for the package's
+    top-level imports, the slowest modules by self time, and any heavy dependency it loaded.
+    """
+    root = module.split(".", 1)[0]
+    best_ms, best_rows, heavy = float("inf"), [], []
+    for _ in range(max(1, repeat)):
+        rows, heavy = _importtime(module)
+        # Top-level package entries are what this import triggered (startup modules are already loaded).
+        mine = [i for i, r in enumerate(rows) if r[3] == 0 and r[2].split(".", 1)[0] == root]
+        total = sum(rows[i][1] for i in mine) / 1e3
+        if total < best_ms:
+            # Rows are emitted children-first, so the import's subtree starts after the previous top-level entry.
+            start = max([i for i, r in enumerate(rows[: mine[0]]) if r[3] == 0], default=-1) + 1 if mine else 0
+            best_ms, best_rows = total, rows[start:]
+    slowest = sorted(best_rows, key=lambda r: -r[0])[:8]
+    return {
+        "ms": best_ms,
+        "slowest": [(name, self_us / 1e3) for self_us, _, name, _ in slowest],
+        "heavy": [m for m in heavy if m not in ALLOWED_HEAVY.get(module, ())],
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Fail if importing the CLI/core exceeds its cold-start budget.")
+    ap.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="MODULE=MS",
+        help="Override/add a budget, e.g. feeding_ai.core=40 (repeatable).",
+    )
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for item in args.budget:
+        mod, _, ms = item.partition("=")
+        budgets[mod.strip()] = float(ms)
+
+    failed = False
+    for module, budget in budgets.items():
+        res = measure(module, args.repeat)
+        ok = res["ms"] <= budget and not res["heavy"]
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<24} {res['ms']:7.1f} ms (budget {budget:.0f} ms)")
+        if res["heavy"]:
+            print(f"     eagerly imports: {', '.join(res['heavy'])}")
+        if not ok:
+            for name, ms in res["slowest"]:
+                print(f"     {ms:7.2f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
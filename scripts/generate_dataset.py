@@ -1,19 +1,28 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import random
+import re
+import shutil
 import sys
+import unicodedata
 import uuid
+from collections import Counter
+from multiprocessing import Pool
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from feeding_ai.dataset_io import concat_parquet, write_parquet
 from feeding_ai.generators.rule_based import RuleBasedGenerator
 from feeding_ai.lang import Lang
+from feeding_ai.nutrition import sport_type
 from feeding_ai.parser import parse_profile
 
 
@@ -30,65 +39,329 @@ SPORTS = [
 ]
 
 
-def make_prompt(lang: str, height_cm: int, weight_kg: int, sport_ar: str, sport_en: str) -> str:
+# Prompt templates per language in make_prompt.
+N_TEMPLATES = 3
+
+
+def make_prompt(
+    lang: str,
+    height_cm: int,
+    weight_kg: int,
+    sport_ar: str,
+    sport_en: str,
+    rng: random.Random,
+    template: Optional[int] = None,
+) -> str:
+    """A user message in one of N_TEMPLATES phrasings; `template` picks one, otherwise `rng` does."""
     if lang == "ar":
         templates = [
             f"طولي {height_cm} سم ووزني {weight_kg} كجم وبمارس {sport_ar}",
             f"الطول: {height_cm} سم، الوزن: {weight_kg} كجم، الرياضة: {sport_ar}",
             f"أنا طولي {height_cm} سم ووزني {weight_kg} كيلو وبلعب {sport_ar}. عايز نظام غذائي وتمارين.",
         ]
-        return random.choice(templates)
+        return templates[template] if template is not None else rng.choice(templates)
     templates = [
         f"I am {height_cm} cm, {weight_kg} kg, I do {sport_en}",
         f"Height: {height_cm} cm, Weight: {weight_kg} kg, Sport: {sport_en}",
         f"My height is {height_cm} cm and my weight is {weight_kg} kg. I play {sport_en}. Need a meal plan and workouts.",
     ]
-    return random.choice(templates)
+    return templates[template] if template is not None else rng.choice(templates)
+
+
+def shard_rng(seed: int, shard: int) -> random.Random:
+    # String seeds are hashed with SHA-512, so this is stable across processes and runs.
+    return random.Random(f"{seed}:{shard}")
+
+
+def iter_shard(seed: int, shard: int, start: int, stop: int) -> Iterator[Dict[str, Any]]:
+    """
+    Records for global sample indices [start, stop); depends only on (seed, shard), never on worker count.
+    Completions come split as `completion_head` + `completion_tail` (see RuleBasedGenerator.generate_parts).
+    """
+    rng = shard_rng(seed, shard)
+    gen = RuleBasedGenerator()
+    for i in range(start, stop):
+        lang = "ar" if (i % 2 == 0) else "en"
+        sport = rng.choice(SPORTS)
+        height_cm = rng.randint(150, 200)
+        weight_kg = rng.randint(45, 120)
+        yield _record(rng, gen, lang, sport, height_cm, weight_kg)
+
+
+def _record(
+    rng: random.Random, gen: RuleBasedGenerator, lang: str, sport: Tuple[str, str, str], height_cm: int, weight_kg: int,
+    template: Optional[int] = None,
+) -> Dict[str, Any]:
+    _, sport_ar, sport_en = sport
+    prompt = make_prompt(lang, height_cm, weight_kg, sport_ar, sport_en, rng, template)
+    profile = parse_profile(prompt, Lang(lang))
+    head, tail = gen.generate_parts(profile, Lang(lang))
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "lang": lang,
+        "prompt": prompt,
+        "profile": {
+            "height_cm": profile.height_cm,
+            "weight_kg": profile.weight_kg,
+            "sport": profile.sport,
+            "sport_raw": profile.sport_raw,
+        },
+        "completion_head": head,
+        "completion_tail": tail,
+    }
+
+
+def parse_bins(spec: str) -> List[Tuple[int, int]]:
+    """`LO:HI:STEP` -> inclusive (lo, hi) bins, e.g. 150:200:10 -> (150, 159), ..., (190, 200)."""
+    lo, hi, step = (int(x) for x in spec.split(":"))
+    if step <= 0 or hi < lo:
+        raise ValueError(f"bad bin spec {spec!r}; expected LO:HI:STEP with HI >= LO and STEP > 0")
+    starts = list(range(lo, hi + 1, step))
+    if len(starts) > 1 and hi - starts[-1] < step // 2:
+        # Fold a short tail into the previous bin instead of a nearly empty one.
+        starts.pop()
+    return [(a, (starts[i + 1] - 1) if i + 1 < len(starts) else hi) for i, a in enumerate(starts)]
+
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def content_hash(rec: Dict[str, Any]) -> str:
+    """Dedup key: normalized prompt + completion (formatting-only differences collide)."""
+    body = normalize_text(rec["prompt"]) + "\x00" + normalize_text(rec["completion_head"] + rec["completion_tail"])
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def iter_grid(
+    seed: int,
+    height_bins: List[Tuple[int, int]],
+    weight_bins: List[Tuple[int, int]],
+    per_cell: int,
+    report: Dict[str, Any],
+    max_tries: int = 8,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stratified records: `per_cell` distinct samples for every lang x sport x template x height bin x
+    weight bin cell, with height/weight drawn inside the bins. Candidates whose content hash was
+    already emitted are redrawn up to `max_tries` times. Fills `report` (coverage, duplicates,
+    per-dimension counts) as it goes; a cell is reproducible from (seed, cell) alone.
+    """
+    gen = RuleBasedGenerator()
+    seen: set = set()
+    dims: Dict[str, Counter] = {k: Counter() for k in ("lang", "sport", "sport_type", "template", "height_bin", "weight_bin")}
+    cells = covered = duplicates = 0
+    short: List[str] = []
+    for lang in ("ar", "en"):
+        for sport in SPORTS:
+            for template in range(N_TEMPLATES):
+                for hb in height_bins:
+                    for wb in weight_bins:
+                        cell = f"{lang}/{sport[0]}/t{template}/h{hb[0]}-{hb[1]}/w{wb[0]}-{wb[1]}"
+                        rng = random.Random(f"{seed}:grid:{cell}")
+                        cells += 1
+                        got = 0
+                        for _ in range(per_cell * max_tries):
+                            if got == per_cell:
+                                break
+                            rec = _record(rng, gen, lang, sport, rng.randint(*hb), rng.randint(*wb), template)
+                            key = content_hash(rec)
+                            if key in seen:
+                                duplicates += 1
+                                continue
+                            seen.add(key)
+                            got += 1
+                            for dim, value in (
+                                ("lang", lang),
+                                ("sport", sport[0]),
+                                ("sport_type", sport_type(sport[0])),
+                                ("template", f"t{template}"),
+                                ("height_bin", f"{hb[0]}-{hb[1]}"),
+                                ("weight_bin", f"{wb[0]}-{wb[1]}"),
+                            ):
+                                dims[dim][value] += 1
+                            yield rec
+                        covered += got > 0
+                        if got < per_cell:
+                            short.append(f"{cell} ({got}/{per_cell})")
+    report.update(
+        {
+            "cells": cells,
+            "covered_cells": covered,
+            "coverage": round(covered / cells, 4) if cells else 0.0,
+            "per_cell": per_cell,
+            "samples": len(seen),
+            "duplicates_dropped": duplicates,
+            "short_cells": short,
+            "dimensions": {dim: dict(c) for dim, c in dims.items()},
+        }
+    )
+
+
+def write_grid(args: argparse.Namespace, out_path: Path, fmt: str) -> int:
+    report: Dict[str, Any] = {
+        "params": {
+            "seed": int(args.seed),
+            "height_bins": args.height_bins,
+            "weight_bins": args.weight_bins,
+            "per_cell": int(args.per_cell),
+        }
+    }
+    records = iter_grid(
+        int(args.seed), parse_bins(args.height_bins), parse_bins(args.weight_bins), max(1, int(args.per_cell)), report
+    )
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    if fmt == "parquet":
+        write_parquet(records, tmp)
+    else:
+        with tmp.open("w", encoding="utf-8") as f:
+            for rec in records:
+                f.write(json.dumps(to_jsonl_record(rec), ensure_ascii=False) + "\n")
+    os.replace(tmp, out_path)
+
+    report_path = out_path.with_name(out_path.name + ".coverage.json")
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(
+        f"Wrote {report['samples']} samples to {out_path}: {report['covered_cells']}/{report['cells']} cells covered "
+        f"({report['coverage']:.1%}), {report['duplicates_dropped']} duplicates dropped"
+    )
+    for dim, counts in report["dimensions"].items():
+        print(f"  {dim:<11} " + "  ".join(f"{k}={v}" for k, v in counts.items()))
+    if report["short_cells"]:
+        print(f"  {len(report['short_cells'])} cells below --per_cell, e.g. {report['short_cells'][0]}")
+    print(f"Coverage report: {report_path}")
+    return 0 if report["covered_cells"] == report["cells"] else 1
+
+
+def to_jsonl_record(rec: Dict[str, Any]) -> Dict[str, Any]:
+    out = {k: v for k, v in rec.items() if k not in ("completion_head", "completion_tail")}
+    out["completion"] = rec["completion_head"] + rec["completion_tail"]
+    return out
+
+
+def shard_path(shard_dir: Path, shard: int, fmt: str = "jsonl") -> Path:
+    return shard_dir / f"shard-{shard:05d}.{fmt}"
+
+
+def write_shard(task: Tuple[int, int, int, int, str, str]) -> Tuple[int, int]:
+    seed, shard, start, stop, shard_dir, fmt = task
+    path = shard_path(Path(shard_dir), shard, fmt)
+    tmp = path.with_suffix(".tmp")
+    if fmt == "parquet":
+        write_parquet(iter_shard(seed, shard, start, stop), tmp)
+    else:
+        with tmp.open("w", encoding="utf-8") as f:
+            for rec in iter_shard(seed, shard, start, stop):
+                f.write(json.dumps(to_jsonl_record(rec), ensure_ascii=False) + "\n")
+    # Rename only when complete, so an interrupted shard is never mistaken for a finished one.
+    os.replace(tmp, path)
+    return shard, stop - start
+
+
+def _load_manifest(path: Path, params: Dict[str, Any]) -> List[int]:
+    if not path.exists():
+        return []
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return []
+    if data.get("params") != params:
+        print(f"Manifest {path} was written with different parameters; starting over.", file=sys.stderr)
+        return []
+    return [int(s) for s in data.get("completed", [])]
+
+
+def _save_manifest(path: Path, params: Dict[str, Any], completed: List[int]) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"params": params, "completed": sorted(completed)}), encoding="utf-8")
+    os.replace(tmp, path)
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--out", required=True, help="Output JSONL path.")
+    ap.add_argument("--out", required=True, help="Output path (.jsonl, or .parquet for the compact columnar format).")
     ap.add_argument("--n", type=int, default=2000, help="Number of samples.")
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes (output does not depend on this).")
+    ap.add_argument("--shard_size", type=int, default=10000, help="Samples per shard; part of the seed derivation.")
+    ap.add_argument("--resume", action="store_true", help="Skip shards already recorded in the manifest.")
+    ap.add_argument("--no_merge", action="store_true", help="Keep per-shard files instead of merging into --out.")
+    ap.add_argument(
+        "--format",
+        choices=["jsonl", "parquet"],
+        default=None,
+        help="Output format; defaults to the --out suffix. Parquet stores shared plan text once (needs pyarrow).",
+    )
+    ap.add_argument(
+        "--mode",
+        choices=["random", "grid"],
+        default="random",
+        help="random: --n uniform samples; grid: every lang x sport x template x height/weight bin cell, "
+        "deduplicated, plus a <out>.coverage.json report (--n/--workers/--shard_size are ignored).",
+    )
+    ap.add_argument("--height_bins", default="150:200:10", help="Grid mode height bins (cm) as LO:HI:STEP.")
+    ap.add_argument("--weight_bins", default="45:120:15", help="Grid mode weight bins (kg) as LO:HI:STEP.")
+    ap.add_argument("--per_cell", type=int, default=1, help="Grid mode: distinct samples per cell.")
     args = ap.parse_args()
 
-    random.seed(args.seed)
-
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.mode == "grid":
+        return write_grid(args, out_path, args.format or ("parquet" if out_path.suffix == ".parquet" else "jsonl"))
+    shard_dir = out_path.with_name(out_path.name + ".shards")
+    shard_dir.mkdir(exist_ok=True)
+    manifest_path = out_path.with_name(out_path.name + ".manifest.json")
 
-    gen = RuleBasedGenerator()
+    fmt = args.format or ("parquet" if out_path.suffix == ".parquet" else "jsonl")
+    n, size = int(args.n), max(1, int(args.shard_size))
+    params = {"n": n, "seed": int(args.seed), "shard_size": size, "format": fmt}
+    bounds = [(s, s * size, min(n, (s + 1) * size)) for s in range((n + size - 1) // size)]
 
-    with out_path.open("w", encoding="utf-8") as f:
-        for i in range(int(args.n)):
-            lang = "ar" if (i % 2 == 0) else "en"
-            _, sport_ar, sport_en = random.choice(SPORTS)
-            height_cm = random.randint(150, 200)
-            weight_kg = random.randint(45, 120)
-
-            prompt = make_prompt(lang, height_cm, weight_kg, sport_ar, sport_en)
-            profile = parse_profile(prompt, Lang(lang))
-            completion = gen.generate(profile, Lang(lang))
-
-            rec = {
-                "id": str(uuid.uuid4()),
-                "lang": lang,
-                "prompt": prompt,
-                "profile": {
-                    "height_cm": profile.height_cm,
-                    "weight_kg": profile.weight_kg,
-                    "sport": profile.sport,
-                    "sport_raw": profile.sport_raw,
-                },
-                "completion": completion,
-            }
-            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-
-    print(f"Wrote {args.n} samples to {out_path}")
+    completed = _load_manifest(manifest_path, params) if args.resume else []
+    completed = [s for s in completed if shard_path(shard_dir, s, fmt).exists()]
+    done = set(completed)
+    tasks = [(int(args.seed), s, a, b, str(shard_dir), fmt) for s, a, b in bounds if s not in done]
+    if done:
+        print(f"Resuming: {len(done)}/{len(bounds)} shards already complete")
+    _save_manifest(manifest_path, params, completed)
+
+    workers = max(1, int(args.workers))
+    if workers == 1 or len(tasks) <= 1:
+        results = map(write_shard, tasks)
+        pool = None
+    else:
+        pool = Pool(processes=min(workers, len(tasks)))
+        results = pool.imap_unordered(write_shard, tasks)
+    try:
+        for shard, count in results:
+            completed.append(shard)
+            _save_manifest(manifest_path, params, completed)
+            print(f"shard {shard:05d}: {count} samples ({len(completed)}/{len(bounds)})")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if args.no_merge:
+        print(f"Wrote {n} samples in {len(bounds)} shards under {shard_dir}")
+        return 0
+
+    if fmt == "parquet":
+        concat_parquet([shard_path(shard_dir, s, fmt) for s, _, _ in bounds], out_path)
+    else:
+        with out_path.open("wb") as out:
+            for s, _, _ in bounds:
+                with shard_path(shard_dir, s, fmt).open("rb") as f:
+                    shutil.copyfileobj(f, out)
+    shutil.rmtree(shard_dir)
+    manifest_path.unlink()
+
+    print(f"Wrote {n} samples to {out_path}")
     return 0
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+
+MESSAGES = [
+    "I am 180 cm, 80 kg, I play football",
+    "طولي 170 سم ووزني 65 كجم وبمارس السباحة",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    out = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            stat = Path(f"/proc/{entry}/stat").read_text()
+        except OSError:
+            continue
+        # Field 4 is the parent pid; the command name (field 2) may contain spaces, so split after ')'.
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            out.append(int(entry))
+    return sorted(out)
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """RSS, PSS and private (unshared) memory of a process from /proc/<pid>/smaps_rollup, in MB."""
+    fields: Dict[str, float] = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[-1] == "kB":
+            fields[name] = int(parts[0]) / 1024
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def _get(url: str, timeout: float = 5.0) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def _post(url: str, body: Dict[str, Any], timeout: float = 300.0) -> int:
+    req = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        return r.status
+
+
+def run(args: argparse.Namespace, share: bool) -> Dict[str, Any]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    cmd = [
+        sys.executable, "-m", "feeding_ai.service.serve",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers),
+        "--preload", args.model, "--llm-mode", args.llm_mode, "--threads", "1", "--log-level", "warning",
+    ]
+    if not share:
+        cmd.append("--no-share")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE if args.quiet else None)
+    try:
+        # /ready is answered by whichever worker accepts; require a run of 200s so every worker is warm.
+        deadline, streak = time.monotonic() + args.timeout, 0
+        while streak < args.workers * 4:
+            if time.monotonic() > deadline or proc.poll() is not None:
+                raise RuntimeError(f"server did not become ready (exit code {proc.poll()})")
+            streak = streak + 1 if _get(f"{base}/ready") == 200 else 0
+            time.sleep(0.05 if streak else 0.5)
+        for i in range(args.requests):
+            _post(f"{base}/generate", {"text": MESSAGES[i % len(MESSAGES)], "llm_base_model": args.model, "llm_mode": args.llm_mode})
+        time.sleep(1.0)
+        master = memory_mb(proc.pid)
+        workers = [memory_mb(pid) for pid in _children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    n = max(1, len(workers))
+    return {
+        "mode": "shared" if share else "per-worker",
+        "master": master,
+        "workers": workers,
+        "worker_private_mb": sum(w["private"] for w in workers) / n,
+        "worker_rss_mb": sum(w["rss"] for w in workers) / n,
+        "total_pss_mb": master["pss"] + sum(w["pss"] for w in workers),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description="Per-worker memory of feeding_ai.service.serve with models shared before fork vs loaded per worker (Linux)."
+    )
+    ap.add_argument("--model", required=True, help="Local model path to preload (use one of a few hundred MB to see the effect).")
+    ap.add_argument("--workers", type=int, default=3)
+    ap.add_argument("--llm-mode", default="fp32")
+    ap.add_argument("--requests", type=int, default=4, help="LLM requests sent before measuring.")
+    ap.add_argument("--timeout", type=float, default=600.0, help="Seconds to wait for readiness.")
+    ap.add_argument("--out", default=None, help="Write results as JSON to this path.")
+    ap.add_argument("--quiet", action="store_true", help="Hide server logs.")
+    args = ap.parse_args()
+
+    if not Path("/proc/self/smaps_rollup").exists():
+        print("needs Linux /proc/<pid>/smaps_rollup", file=sys.stderr)
+        return 2
+
+    results = [run(args, share=True), run(args, share=False)]
+    print(f"{'mode':<11} {'worker RSS':>11} {'worker private':>15} {'master PSS':>11} {'total PSS':>10}  (MB, {args.workers} workers)")
+    for r in results:
+        print(
+            f"{r['mode']:<11} {r['worker_rss_mb']:>11.1f} {r['worker_private_mb']:>15.1f} "
+            f"{r['master']['pss']:>11.1f} {r['total_pss_mb']:>10.1f}"
+        )
+    shared, own = results
+    print(
+        f"Each extra worker costs {shared['worker_private_mb']:.1f} MB private with shared models vs "
+        f"{own['worker_private_mb']:.1f} MB when it loads its own copy."
+    )
+    if args.out:
+        Path(args.out).write_text(json.dumps({"workers": args.workers, "model": args.model, "results": results}, indent=2) + "\n")
+        print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,99 +1,402 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
 import os
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+SYSTEM_PROMPTS = {
+    "ar": (
+        "أنت مساعد تغذية وتمارين للرياضيين. "
+        "اعطِ خطة غذائية كاملة لثلاث وجبات مع العناصر الغذائية وأمثلة أطعمة، "
+        "بالإضافة لخطة تمارين للجيم وخطة منزلية. التزم بالعربية."
+    ),
+    "en": (
+        "You are a nutrition + workout coach for athletes. "
+        "Return a complete 3-meal plan with nutrients and food examples, "
+        "plus a gym workout plan and a home workout plan. Write in English."
+    ),
+}
+TEMPLATE = "<|system|>\n{system}\n<|user|>\n{prompt}\n<|assistant|>\n{completion}"
+
+# Token-length histogram edges; the last bucket is open-ended.
+LENGTH_BUCKETS = (64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 3072, 4096)
+
+
+def to_text(ex: Dict[str, Any]) -> str:
+    system = SYSTEM_PROMPTS["ar" if ex.get("lang", "en") == "ar" else "en"]
+    return TEMPLATE.format(system=system, prompt=ex["prompt"], completion=ex["completion"])
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(data_path: str, tokenizer: Any) -> str:
+    """Changes whenever the data file, the tokenizer (name, class, vocabulary) or the prompt template does."""
+    ident = {
+        "data": _file_digest(data_path),
+        "tokenizer": getattr(tokenizer, "name_or_path", ""),
+        "tokenizer_class": type(tokenizer).__name__,
+        "vocab": hashlib.sha256(json.dumps(sorted(tokenizer.get_vocab().items())).encode("utf-8")).hexdigest(),
+        "eos": tokenizer.eos_token_id,
+        "template": TEMPLATE,
+        "system": SYSTEM_PROMPTS,
+    }
+    return hashlib.sha256(json.dumps(ident, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:24]
+
+
+def tokenize_cached(data_path: str, tokenizer: Any, cache_dir: str, batch_size: int = 1000) -> Tuple[Any, Any, bool]:
+    """
+    Token ids of every example (EOS appended), as one flat int32 array plus int64 offsets
+    (example i is ids[offsets[i]:offsets[i + 1]]). Stored under `cache_dir/<cache_key>/` and
+    memory-mapped on later runs. Returns (ids, offsets, cache_hit).
+    """
+    import numpy as np
+
+    from feeding_ai.dataset_io import read_records
+
+    out = Path(cache_dir) / cache_key(data_path, tokenizer)
+    if (out / "meta.json").exists():
+        return np.load(out / "ids.npy", mmap_mode="r"), np.load(out / "offsets.npy"), True
+
+    chunks: List[Any] = []
+    lengths: List[int] = []
+    batch: List[str] = []
+
+    def _flush() -> None:
+        for ids in tokenizer(batch, add_special_tokens=True)["input_ids"]:
+            ids = list(ids) + [tokenizer.eos_token_id]
+            chunks.append(np.asarray(ids, dtype=np.int32))
+            lengths.append(len(ids))
+        batch.clear()
+
+    for ex in read_records(data_path):
+        batch.append(to_text(ex))
+        if len(batch) >= batch_size:
+            _flush()
+    if batch:
+        _flush()
+
+    ids = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    # Write to a temp dir and rename, so an interrupted run never leaves a half cache behind.
+    tmp = out.with_name(out.name + f".tmp{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    np.save(tmp / "ids.npy", ids)
+    np.save(tmp / "offsets.npy", offsets)
+    (tmp / "meta.json").write_text(
+        json.dumps({"data": str(data_path), "tokenizer": getattr(tokenizer, "name_or_path", ""), "examples": len(lengths)}),
+        encoding="utf-8",
+    )
+    try:
+        tmp.rename(out)
+    except OSError:
+        # Another run finished first; its cache is identical.
+        import shutil
+
+        shutil.rmtree(tmp, ignore_errors=True)
+    return ids, offsets, False
+
+
+def length_report(lengths: Sequence[int], max_seq_len: int) -> str:
+    """Histogram of example lengths in tokens, percentiles and how much `max_seq_len` would truncate."""
+    import numpy as np
+
+    lens = np.asarray(lengths)
+    if not len(lens):
+        return "no examples"
+    edges = [b for b in LENGTH_BUCKETS if b < lens.max()] + [int(lens.max())]
+    # Buckets are inclusive ranges lo..hi; numpy bins are [lo, hi + 1).
+    lows = [min(1, int(lens.min()))] + [e + 1 for e in edges[:-1]]
+    counts = np.histogram(lens, bins=lows + [edges[-1] + 1])[0]
+    width = max(1, int(counts.max()))
+    lines = [f"{len(lens)} examples, {int(lens.sum()):,} tokens"]
+    for lo, hi, c in zip(lows, edges, counts):
+        lines.append(f"  {lo:>5}-{hi:<5} {int(c):>8}  {'#' * max(1 if c else 0, int(40 * c / width))}")
+    pct = {p: int(np.percentile(lens, p)) for p in (50, 90, 95, 99)}
+    lines.append("  " + "  ".join(f"p{p}={v}" for p, v in pct.items()) + f"  max={int(lens.max())}")
+    over = lens > max_seq_len
+    lines.append(
+        f"  max_seq_len={max_seq_len}: {int(over.sum())} examples ({over.mean():.1%}) truncated, "
+        f"{int((lens[over] - max_seq_len).sum()):,} tokens dropped without packing"
+    )
+    fit = next((b for b in LENGTH_BUCKETS if b >= pct[99]), int(lens.max()))
+    lines.append(f"  suggested --max_seq_len (covers p99): {fit}")
+    return "\n".join(lines)
+
+
+class BatchDataset:
+    """
+    Training micro-batches as int64 numpy arrays (input_ids, attention_mask, labels):
+
+    - `padded`: shuffled examples, each batch padded to its longest member (the old behaviour);
+    - `grouped`: examples of similar length share a batch, batch order shuffled;
+    - `packed`: examples joined (EOS-separated) and cut into full `max_seq_len` rows.
+
+    Padded/grouped truncate examples to `max_seq_len`; packing keeps every token. Only the example
+    order and each batch's index range are kept; a batch is assembled from the (memory-mapped)
+    token cache when it is requested, so memory stays flat however large the dataset.
+    """
+
+    def __init__(
+        self,
+        ids: Any,
+        offsets: Any,
+        *,
+        mode: str,
+        batch_size: int,
+        max_seq_len: int,
+        pad_id: int,
+        seed: int = 42,
+    ) -> None:
+        import numpy as np
+
+        if mode not in ("padded", "grouped", "packed"):
+            raise ValueError(f"unknown batching mode {mode!r}")
+        self.ids, self.offsets, self.mode = ids, offsets, mode
+        self.max_seq_len, self.pad_id = max_seq_len, pad_id
+        self.lengths = np.diff(offsets)
+        rng = random.Random(seed)
+        n = len(offsets) - 1
+        order = list(range(n))
+        rng.shuffle(order)
+        if mode == "grouped":
+            # Sort within mega-batches so batches stay random-ish while lengths line up.
+            group = batch_size * 50
+            length = self.lengths.__getitem__
+            order = [i for g in range(0, n, group) for i in sorted(order[g:g + group], key=length, reverse=True)]
+        self.order = np.asarray(order, dtype=np.int64)
+        if mode == "packed":
+            # Where each example starts in the stream of all (shuffled) examples laid end to end;
+            # batch k holds packed rows lo..hi of that stream.
+            self.starts = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(self.lengths[self.order], out=self.starts[1:])
+            rows = -(-int(self.starts[-1]) // max_seq_len)
+            self.batches = [(j, min(j + batch_size, rows)) for j in range(0, rows, batch_size)]
+        else:
+            # Batch k holds examples order[lo:hi].
+            self.batches = [(j, min(j + batch_size, n)) for j in range(0, n, batch_size)]
+            if mode == "grouped":
+                rng.shuffle(self.batches)
+
+    def __len__(self) -> int:
+        return len(self.batches)
+
+    def _stream(self, start: int, end: int) -> Any:
+        """Tokens start..end of the packed stream."""
+        import numpy as np
+
+        k = int(np.searchsorted(self.starts, start, side="right")) - 1
+        parts = []
+        while start < end:
+            i = self.order[k]
+            take = min(end, int(self.starts[k + 1])) - start
+            base = int(self.offsets[i]) + start - int(self.starts[k])
+            parts.append(self.ids[base:base + take])
+            start += take
+            k += 1
+        return np.concatenate(parts)
+
+    def _row_lengths(self, k: int) -> List[int]:
+        lo, hi = self.batches[k]
+        if self.mode == "packed":
+            size = int(self.starts[-1])
+            return [min(self.max_seq_len, size - r * self.max_seq_len) for r in range(lo, hi)]
+        return [min(self.max_seq_len, int(n)) for n in self.lengths[self.order[lo:hi]]]
+
+    def __getitem__(self, k: int) -> Dict[str, Any]:
+        import numpy as np
+
+        lo, hi = self.batches[k]
+        if self.mode == "packed":
+            size, width = int(self.starts[-1]), self.max_seq_len
+            seqs = [self._stream(r * width, min((r + 1) * width, size)) for r in range(lo, hi)]
+        else:
+            seqs = [self.ids[self.offsets[i]:self.offsets[i + 1]][: self.max_seq_len] for i in self.order[lo:hi]]
+        width = max(len(s) for s in seqs)
+        input_ids = np.full((len(seqs), width), self.pad_id, dtype=np.int64)
+        mask = np.zeros((len(seqs), width), dtype=np.int64)
+        for r, s in enumerate(seqs):
+            input_ids[r, : len(s)] = s
+            mask[r, : len(s)] = 1
+        labels = np.where(mask == 1, input_ids, -100)
+        return {"input_ids": input_ids, "attention_mask": mask, "labels": labels}
+
+    def padding_stats(self) -> Tuple[int, int]:
+        """(real tokens, padded tokens) over all batches, from lengths alone."""
+        real = total = 0
+        for k in range(len(self.batches)):
+            lens = self._row_lengths(k)
+            real += sum(lens)
+            total += len(lens) * max(lens)
+        return real, total
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--base_model", required=True, help="HuggingFace model name/path (instruct model recommended).")
-    ap.add_argument("--data", required=True, help="JSONL dataset path from generate_dataset.py")
-    ap.add_argument("--out", required=True, help="Output directory for LoRA adapters")
+    ap.add_argument("--data", required=True, help="JSONL or Parquet dataset path from generate_dataset.py")
+    ap.add_argument("--out", default=None, help="Output directory for LoRA adapters (required unless --stats_only)")
     ap.add_argument("--epochs", type=float, default=1.0)
+    ap.add_argument("--max_steps", type=int, default=-1, help="Stop after this many optimizer steps (-1 = full epochs).")
     ap.add_argument("--lr", type=float, default=2e-4)
-    ap.add_argument("--batch_size", type=int, default=1)
+    ap.add_argument("--batch_size", type=int, default=1, help="Sequences (or packed rows) per micro-batch.")
     ap.add_argument("--grad_accum", type=int, default=8)
     ap.add_argument("--max_seq_len", type=int, default=2048)
+    ap.add_argument(
+        "--batching",
+        choices=["padded", "grouped", "packed"],
+        default="packed",
+        help="padded: random batches padded to the longest; grouped: length-grouped batches; "
+        "packed: examples concatenated into full max_seq_len rows (default).",
+    )
+    ap.add_argument(
+        "--cache_dir",
+        default=os.path.join(os.path.expanduser("~"), ".cache", "feeding_ai", "tokenized"),
+        help="Where tokenized datasets are cached (keyed by data hash, tokenizer and template).",
+    )
+    ap.add_argument("--target_modules", default="q_proj,k_proj,v_proj,o_proj,gate_proj,up_proj,down_proj")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument(
+        "--stats_only",
+        action="store_true",
+        help="Print the length histogram and padding efficiency of each batching mode, then exit.",
+    )
     args = ap.parse_args()
+    if args.out is None and not args.stats_only:
+        ap.error("--out is required unless --stats_only is given")
 
-    from datasets import load_dataset
-    from peft import LoraConfig
-    from transformers import AutoModelForCausalLM, AutoTokenizer, TrainingArguments
-    from trl import SFTTrainer
-    import torch
-
-    ds = load_dataset("json", data_files=args.data, split="train")
-
-    def to_text(ex):
-        lang = ex.get("lang", "en")
-        if lang == "ar":
-            system = (
-                "أنت مساعد تغذية وتمارين للرياضيين. "
-                "اعطِ خطة غذائية كاملة لثلاث وجبات مع العناصر الغذائية وأمثلة أطعمة، "
-                "بالإضافة لخطة تمارين للجيم وخطة منزلية. التزم بالعربية."
-            )
-        else:
-            system = (
-                "You are a nutrition + workout coach for athletes. "
-                "Return a complete 3-meal plan with nutrients and food examples, "
-                "plus a gym workout plan and a home workout plan. Write in English."
-            )
-        prompt = ex["prompt"]
-        completion = ex["completion"]
-        ex["text"] = f"<|system|>\n{system}\n<|user|>\n{prompt}\n<|assistant|>\n{completion}"
-        return ex
-
-    ds = ds.map(to_text, remove_columns=[c for c in ds.column_names if c != "text"])
+    from transformers import AutoTokenizer
 
     tokenizer = AutoTokenizer.from_pretrained(args.base_model, use_fast=True)
     if tokenizer.pad_token is None:
         tokenizer.pad_token = tokenizer.eos_token
 
+    t0 = time.perf_counter()
+    ids, offsets, hit = tokenize_cached(args.data, tokenizer, args.cache_dir)
+    print(f"Tokenized {len(offsets) - 1} examples in {time.perf_counter() - t0:.2f}s ({'cache hit' if hit else 'cached now'})")
+    print(length_report(offsets[1:] - offsets[:-1], args.max_seq_len))
+
+    def _batches(mode: str) -> BatchDataset:
+        return BatchDataset(
+            ids,
+            offsets,
+            mode=mode,
+            batch_size=args.batch_size,
+            max_seq_len=args.max_seq_len,
+            pad_id=tokenizer.pad_token_id,
+            seed=args.seed,
+        )
+
+    if args.stats_only:
+        for mode in ("padded", "grouped", "packed"):
+            batches = _batches(mode)
+            real, total = batches.padding_stats()
+            print(f"  {mode:<8} {len(batches):>6} batches  {real:>12,} real / {total:>12,} computed tokens  ({real / max(1, total):.1%} useful)")
+        return 0
+
+    from peft import LoraConfig, get_peft_model
+    import transformers
+    from transformers import AutoModelForCausalLM, Trainer, TrainerCallback, TrainingArguments
+    import torch
+
+    dataset = _batches(args.batching)
+    real, total = dataset.padding_stats()
+    print(f"{args.batching}: {len(dataset)} micro-batches, {real / max(1, total):.1%} of computed tokens are real")
+
+    # `dtype` replaced `torch_dtype` in transformers 4.56.
+    new_kwarg = tuple(int(p) for p in transformers.__version__.split(".")[:2]) >= (4, 56)
     model = AutoModelForCausalLM.from_pretrained(
         args.base_model,
-        device_map="auto",
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+        device_map="auto" if torch.cuda.is_available() else None,
+        **{"dtype" if new_kwarg else "torch_dtype": torch.float16 if torch.cuda.is_available() else torch.float32},
     )
-
     peft_config = LoraConfig(
         r=16,
         lora_alpha=32,
         lora_dropout=0.05,
         bias="none",
         task_type="CAUSAL_LM",
-        target_modules=[
-            "q_proj",
-            "k_proj",
-            "v_proj",
-            "o_proj",
-            "gate_proj",
-            "up_proj",
-            "down_proj",
-        ],
+        target_modules=[m.strip() for m in args.target_modules.split(",") if m.strip()],
     )
+    model = get_peft_model(model, peft_config)
+
+    # Every dataset item is a whole micro-batch, so the Trainer's batch size is 1
+    # and its sampler only shuffles batch order.
+    # (real, computed) tokens of each collated micro-batch, in order. The loader fetches ahead,
+    # so they are only counted once the callback sees the micro-batch trained.
+    fetched: Deque[Tuple[int, int]] = deque()
+
+    def collate(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        batch = items[0]
+        fetched.append((int(batch["attention_mask"].sum()), int(batch["attention_mask"].size)))
+        return {k: torch.from_numpy(v) for k, v in batch.items()}
+
+    class _Throughput(TrainerCallback):
+        def on_train_begin(self, *a: Any, **k: Any) -> None:
+            self.t0 = time.perf_counter()
+            self.real = self.total = 0
+
+        def _trained(self) -> None:
+            if fetched:
+                real, total = fetched.popleft()
+                self.real += real
+                self.total += total
+
+        # One of these fires after every micro-batch (on_step_end for the last of each accumulation).
+        def on_substep_end(self, *a: Any, **k: Any) -> None:
+            self._trained()
+
+        def on_step_end(self, *a: Any, **k: Any) -> None:
+            self._trained()
+
+        def on_train_end(self, *a: Any, **k: Any) -> None:
+            secs = time.perf_counter() - self.t0
+            print(
+                f"Trained on {self.real:,} tokens ({self.total:,} incl. padding) in {secs:.1f}s: "
+                f"{self.real / secs:,.1f} tokens/s ({self.total / secs:,.1f} computed tokens/s)"
+            )
 
     train_args = TrainingArguments(
         output_dir=args.out,
         num_train_epochs=float(args.epochs),
+        max_steps=int(args.max_steps),
         learning_rate=float(args.lr),
-        per_device_train_batch_size=int(args.batch_size),
+        per_device_train_batch_size=1,
         gradient_accumulation_steps=int(args.grad_accum),
         logging_steps=10,
         save_steps=200,
         save_total_limit=2,
         fp16=torch.cuda.is_available(),
         bf16=False,
+        use_cpu=not torch.cuda.is_available(),
+        remove_unused_columns=False,
+        seed=int(args.seed),
         report_to=[],
     )
 
-    trainer = SFTTrainer(
+    trainer = Trainer(
         model=model,
-        tokenizer=tokenizer,
-        train_dataset=ds,
-        peft_config=peft_config,
-        max_seq_length=int(args.max_seq_len),
         args=train_args,
-        packing=False,
+        train_dataset=dataset,
+        data_collator=collate,
+        callbacks=[_Throughput()],
     )
 
     trainer.train()
@@ -106,4 +409,3 @@ def main() -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-